@@ -0,0 +1,117 @@
+"""Note insert throughput with and without group commit.
+
+Calls server.create_note() directly (no HTTP, no auth) from many concurrent
+coroutines against a real MongoDB: once with every note inserted on its own,
+once through the group commit batcher. Prints notes per second and latency
+percentiles of both modes as JSON.
+
+Usage:
+    python benchmarks/group_commit.py --concurrency 200 --notes 20000
+    python benchmarks/group_commit.py --window-ms 2 --max-docs 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def seed(server):
+    for name in ("companies", "users", "employees", "notes", "note_rollups", "counters"):
+        await server.db[name].drop()
+    await server.ensure_indexes()
+    now = datetime.now(timezone.utc)
+    company_id = str(uuid.uuid4())
+    user = server.User(id=str(uuid.uuid4()), email="bench@company.bench", company_id=company_id, role="user")
+    employee = server.Employee(employee_number="EMP0000001", name="Mitarbeiter", company_id=company_id)
+    await server.db.companies.insert_one({"id": company_id, "name": "Benchmark", "created_at": now})
+    await server.db.users.insert_one({**user.model_dump(), "password_hash": "-"})
+    await server.db.employees.insert_one(employee.model_dump())
+    return user, employee
+
+
+async def run_mode(server, user, employee, group_commit: bool, notes: int, concurrency: int) -> dict:
+    server.NOTE_GROUP_COMMIT = group_commit
+    latencies = []
+    remaining = notes
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await server.create_note(server.NoteCreate(employee_id=employee.id, note_text="Benchmark-Notiz"), user)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "notes": notes,
+        "duration_s": round(duration, 3),
+        "notes_per_s": round(notes / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+async def main_async(args):
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db
+    import server
+
+    server.connect_mongo()
+    server.note_group_commit.window = args.window_ms / 1000
+    server.note_group_commit.max_docs = args.max_docs
+    try:
+        user, employee = await seed(server)
+        results = {}
+        for name, group_commit in (("insert_one", False), ("group_commit", True)):
+            results[name] = await run_mode(server, user, employee, group_commit, args.notes, args.concurrency)
+            print(f"{name}: {results[name]}", file=sys.stderr)
+        await server.note_group_commit.close()
+    finally:
+        server.client.close()
+
+    print(json.dumps({
+        "config": {
+            "concurrency": args.concurrency,
+            "window_ms": args.window_ms,
+            "max_docs": args.max_docs,
+        },
+        "modes": results,
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="staff_scanner_bench", help="Benchmark database, its notes are dropped")
+    parser.add_argument("--notes", type=int, default=20000, help="Notes per mode")
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent create_note calls")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-docs", type=int, default=100)
+    args = parser.parse_args()
+    if "bench" not in args.db:
+        parser.error("--db must contain 'bench'; its collections are dropped")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
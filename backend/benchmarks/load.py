@@ -0,0 +1,360 @@
+"""Load and latency benchmark against a local MongoDB.
+
+Seeds a dedicated benchmark database with synthetic companies, users,
+employees and notes, boots ``uvicorn server:app`` against it (or targets an
+already running server with --base-url) and drives each scenario with a pool
+of concurrent clients. Results are printed as JSON: throughput plus p50, p95
+and p99 latency per scenario, tagged with the current git commit so runs can
+be compared with --compare.
+
+Usage:
+    python benchmarks/load.py --notes 1000000 --concurrency 32 --output run.json
+    python benchmarks/load.py --no-seed --compare run.json
+
+Scenarios: login, scan, create_note, list_notes, list_employees, export
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import requests
+from passlib.context import CryptContext
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "benchmark"
+SCENARIOS = ["login", "scan", "create_note", "list_notes", "list_employees", "export"]
+INSERT_BATCH_SIZE = 10000
+
+
+# Seeding
+def seed(db, companies: int, users: int, employees: int, notes: int):
+    # Counters, rollups, archive, leases and rate limits of earlier runs go too
+    db.client.drop_database(db.name)
+
+    now = datetime.now(timezone.utc)
+    password_hash = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+    dataset = []
+    for c in range(companies):
+        company_id = str(uuid.uuid4())
+        db.companies.insert_one({"id": company_id, "name": f"Benchmark {c}", "created_at": now})
+        user_docs = [{
+            "id": str(uuid.uuid4()),
+            "email": f"user{u}@company{c}.bench",
+            "company_id": company_id,
+            "role": "admin" if u == 0 else "user",
+            "password_hash": password_hash,
+            "created_at": now,
+        } for u in range(users)]
+        db.users.insert_many(user_docs)
+        employee_docs = [{
+            "id": str(uuid.uuid4()),
+            "employee_number": f"EMP{e:07d}",
+            "name": f"Mitarbeiter {e}",
+            "company_id": company_id,
+            "created_at": now,
+        } for e in range(employees)]
+        for start in range(0, len(employee_docs), INSERT_BATCH_SIZE):
+            db.employees.insert_many(employee_docs[start:start + INSERT_BATCH_SIZE], ordered=False)
+        dataset.append({
+            "company_id": company_id,
+            "users": [(doc["id"], doc["email"]) for doc in user_docs],
+            "employees": [(doc["id"], doc["employee_number"]) for doc in employee_docs],
+        })
+
+    batch = []
+    for n in range(notes):
+        company = dataset[n % companies]
+        timestamp = now - timedelta(seconds=n * 7)
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "employee_id": random.choice(company["employees"])[0],
+            "user_id": random.choice(company["users"])[0],
+            "company_id": company["company_id"],
+            "note_text": f"Notiz {n}: Schichtbeginn ohne Auffälligkeiten.",
+            "timestamp": timestamp,
+            "created_at": timestamp,
+        })
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.notes.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        db.notes.insert_many(batch, ordered=False)
+
+
+def load_dataset(db) -> list:
+    dataset = []
+    for company in db.companies.find({}, {"_id": 0, "id": 1}):
+        dataset.append({
+            "company_id": company["id"],
+            "users": [(u["id"], u["email"]) for u in db.users.find({"company_id": company["id"]}, {"id": 1, "email": 1})],
+            "employees": [
+                (e["id"], e["employee_number"])
+                for e in db.employees.find({"company_id": company["id"]}, {"id": 1, "employee_number": 1})
+            ],
+        })
+    return dataset
+
+
+# Server
+def start_server(mongo_url: str, db_name: str, port: int, workers: int):
+    # Admission control would turn the offered load into 429s; it can be re-enabled from the environment
+    env = {
+        "RATE_LIMIT_ENABLED": "false",
+        "EXPORT_MAX_CONCURRENT": "1000",
+        "EXPORT_MAX_CONCURRENT_PER_COMPANY": "1000",
+        **os.environ,
+        "MONGO_URL": mongo_url,
+        "DB_NAME": db_name,
+        "WEB_CONCURRENCY": str(workers),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/health/ready", timeout=1).ok:
+                return process, base_url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Server did not start within 120 seconds")
+
+
+# Scenarios
+class Client:
+    """One simulated device: a logged-in user of a company."""
+
+    _local = threading.local()
+
+    def __init__(self, base_url: str, company: dict, email: str):
+        self.base_url = base_url
+        self.company = company
+        self.email = email
+        self.token = None
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        response = self.session.request(method, f"{self.base_url}/api{path}", headers=headers, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def login(self):
+        response = self.request("POST", "/auth/login", json={"email": self.email, "password": PASSWORD})
+        self.token = response.json()["access_token"]
+
+
+def run_login(client: Client):
+    client.login()
+
+
+def run_scan(client: Client):
+    client.request("GET", f"/employees/number/{random.choice(client.company['employees'])[1]}")
+
+
+def run_create_note(client: Client):
+    client.request("POST", "/notes", json={
+        "employee_id": random.choice(client.company["employees"])[0],
+        "note_text": "Benchmark-Notiz",
+    })
+
+
+def run_list_notes(client: Client):
+    client.request("GET", "/notes", params={"limit": 100})
+
+
+def run_list_employees(client: Client):
+    cursor = None
+    while True:
+        page = client.request("GET", "/employees", params={"limit": 1000, "cursor": cursor}).json()
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+
+def run_export(client: Client):
+    with client.session.get(
+        f"{client.base_url}/api/notes/export/csv",
+        headers={"Authorization": f"Bearer {client.token}"},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for _ in response.iter_content(chunk_size=65536):
+            pass
+
+
+RUNNERS = {
+    "login": run_login,
+    "scan": run_scan,
+    "create_note": run_create_note,
+    "list_notes": run_list_notes,
+    "list_employees": run_list_employees,
+    "export": run_export,
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(name: str, clients: list, total: int, concurrency: int) -> dict:
+    runner = RUNNERS[name]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        client = clients[i % len(clients)]
+        start = time.perf_counter()
+        try:
+            runner(client)
+            ok = True
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, previous: dict):
+    print(f"\n{'scenario':<16}{'metric':<16}{previous.get('commit', '?'):>12}{current['commit']:>12}{'change':>10}",
+          file=sys.stderr)
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            old, new = before[metric], result[metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:<16}{metric:<16}{old:>12}{new:>12}{change:>10}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="staff_scanner_bench", help="Benchmark database, dropped when seeding")
+    parser.add_argument("--companies", type=int, default=5)
+    parser.add_argument("--users", type=int, default=20, help="Users per company")
+    parser.add_argument("--employees", type=int, default=2000, help="Employees per company")
+    parser.add_argument("--notes", type=int, default=100000, help="Notes in total")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the data of a previous run")
+    parser.add_argument("--base-url", help="Target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--export-requests", type=int, default=5, help="Requests of the export scenario")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to print a comparison against")
+    args = parser.parse_args()
+
+    if "bench" not in args.db:
+        parser.error("--db must contain 'bench'; the database is dropped when seeding")
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(RUNNERS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    mongo = MongoClient(args.mongo_url, tz_aware=True)
+    db = mongo[args.db]
+    if not args.no_seed:
+        started = time.perf_counter()
+        seed(db, args.companies, args.users, args.employees, args.notes)
+        print(f"Seeded {args.notes} notes in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    dataset = load_dataset(db)
+    if not dataset:
+        parser.error("benchmark database is empty, run without --no-seed")
+
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        process, base_url = start_server(args.mongo_url, args.db, args.port, args.workers)
+    try:
+        clients = [Client(base_url, company, email) for company in dataset for _, email in company["users"]]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(Client.login, clients))
+
+        results = {}
+        for name in scenarios:
+            total = args.export_requests if name == "export" else args.requests
+            results[name] = run_scenario(name, clients, total, args.concurrency)
+            print(f"{name}: {results[name]}", file=sys.stderr)
+    finally:
+        if process:
+            process.send_signal(signal.SIGINT)
+            process.wait(timeout=30)
+
+    report = {
+        "commit": git_commit(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "companies": len(dataset),
+            "notes": db.notes.estimated_document_count(),
+            "employees": db.employees.estimated_document_count(),
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+        },
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
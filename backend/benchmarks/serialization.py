@@ -0,0 +1,89 @@
+"""CPU cost of serializing a note listing, with and without the trusted fast path.
+
+Compares FastAPI's default response handling (validate against the route's
+response_model, jsonable encoding, stdlib json) with returning the projected
+documents through trusted_response(). Needs no database.
+
+Usage:
+    python benchmarks/serialization.py [--rows 1000] [--repeat 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+import server  # noqa: E402
+
+
+def make_page(rows: int) -> dict:
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(rows):
+        timestamp = now - timedelta(minutes=i)
+        items.append({
+            "id": str(uuid.uuid4()),
+            "employee_id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "note_text": f"Notiz {i}: Mitarbeiter hat sich zur Schicht angemeldet.",
+            "timestamp": timestamp,
+            "created_at": timestamp,
+        })
+    return {"items": items, "next_cursor": None}
+
+
+def route_field(path: str):
+    for route in server.app.routes:
+        if getattr(route, "path", None) == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+async def default_path(field, page):
+    content = await serialize_response(field=field, response_content=page, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_path(field, page):
+    return server.trusted_response(page).body
+
+
+async def measure(func, field, page, repeat: int) -> float:
+    await func(field, page)
+    start = time.process_time()
+    for _ in range(repeat):
+        await func(field, page)
+    return (time.process_time() - start) / repeat * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Notes per response")
+    parser.add_argument("--repeat", type=int, default=200, help="Responses serialized per measurement")
+    args = parser.parse_args()
+
+    field = route_field("/api/notes")
+    page = make_page(args.rows)
+    before = await measure(default_path, field, page, args.repeat)
+    after = await measure(fast_path, field, page, args.repeat)
+    print(json.dumps({
+        "rows": args.rows,
+        "default_cpu_ms_per_request": round(before, 3),
+        "trusted_cpu_ms_per_request": round(after, 3),
+        "speedup": round(before / after, 1),
+    }))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
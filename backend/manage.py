@@ -0,0 +1,74 @@
+"""Maintenance commands for the backend database.
+
+Usage:
+    python manage.py backfill-note-company-ids [--batch-size 500] [--pause 0.1]
+    python manage.py convert-timestamps [--batch-size 1000] [--pause 0.1]
+    python manage.py rebuild-note-rollups [--company-id ID]
+    python manage.py archive-notes --months 24 [--batch-size 1000] [--pause 0.1]
+"""
+import argparse
+import asyncio
+
+import server
+
+
+async def backfill_note_company_ids(args):
+    updated = await server.backfill_note_company_ids(batch_size=args.batch_size, pause=args.pause)
+    print(f"Backfilled company_id on {updated} notes")
+
+
+async def convert_timestamps(args):
+    converted = await server.convert_string_timestamps(batch_size=args.batch_size, pause=args.pause)
+    print(f"Converted {converted} string timestamps to dates")
+
+
+async def rebuild_note_rollups(args):
+    days = await server.rebuild_note_rollups(company_id=args.company_id)
+    print(f"Rebuilt {days} daily note rollups")
+
+
+async def archive_notes(args):
+    moved = await server.archive_old_notes(args.months, batch_size=args.batch_size, pause=args.pause)
+    print(f"Moved {moved} notes older than {args.months} months to notes_archive")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-note-company-ids", help="Copy company_id onto existing notes")
+    backfill.add_argument("--batch-size", type=int, default=500, help="Employees per bulk write")
+    backfill.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    backfill.set_defaults(handler=backfill_note_company_ids)
+
+    timestamps = commands.add_parser("convert-timestamps", help="Store ISO string timestamps as BSON dates")
+    timestamps.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    timestamps.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    timestamps.set_defaults(handler=convert_timestamps)
+
+    rollups = commands.add_parser("rebuild-note-rollups", help="Recompute the report rollups from the notes")
+    rollups.add_argument("--company-id", help="Only rebuild this company")
+    rollups.set_defaults(handler=rebuild_note_rollups)
+
+    archive = commands.add_parser("archive-notes", help="Move old notes into the archive collection")
+    archive.add_argument("--months", type=int, default=server.NOTE_RETENTION_MONTHS,
+                         help="Retention in months (default: NOTE_RETENTION_MONTHS)")
+    archive.add_argument("--batch-size", type=int, default=1000, help="Notes per bulk write")
+    archive.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    archive.set_defaults(handler=archive_notes)
+
+    args = parser.parse_args()
+    if args.command == "archive-notes" and args.months <= 0:
+        parser.error("archive-notes needs --months or NOTE_RETENTION_MONTHS")
+
+    async def run():
+        server.connect_mongo()
+        await server.ensure_indexes()
+        await args.handler(args)
+        server.client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
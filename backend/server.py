@@ -1,38 +1,1022 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, UploadFile, File, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from bson import json_util
+from pymongo import monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError, WriteError
 import os
+import sys
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from urllib.parse import parse_qsl
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import uuid
-from datetime import datetime, timezone, timedelta
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
 import jwt
+import orjson
 from passlib.context import CryptContext
 import io
 import csv
+import zlib
+import base64
+import math
+import calendar
+import heapq
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Metrics
+# Optional bearer token required to scrape /api/metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+class Metric:
+    """Prometheus metric with a fixed label set; rendering only happens on scrape."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+        METRICS.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+class CallbackMetric(Metric):
+    """Reads its values from `callback` (returning {label_values: value}) on scrape."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple, kind: str, callback):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        values = self.callback()
+        with self._lock:
+            self._values = dict(values)
+        return super().render()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        bucket_labels = self.labels + ("le",)
+        for label_values, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, label_values + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {series[-1]}")
+        return lines
+
+METRICS: List[Metric] = []
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to send the full response, per route", ("method", "route"))
+http_requests_total = Counter(
+    "http_requests_total", "Responses sent, per route and status code", ("method", "route", "status"))
+mongo_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips", ("collection", "command"))
+mongo_command_failures = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error", ("collection", "command"))
+mongo_pool_connections = Gauge(
+    "mongodb_pool_connections", "Connections of the MongoDB pool by state", ("state",))
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "bcrypt work including time queued for the pool", ("operation",))
+export_duration = Histogram(
+    "notes_export_duration_seconds", "Time to stream a complete notes export", ("format",))
+export_rows = Counter("notes_export_rows_total", "Notes written by exports", ("format",))
+cache_entries = CallbackMetric(
+    "cache_entries", "Entries held by in-process caches", ("cache",), "gauge",
+    lambda: {("user",): len(user_cache), ("employee",): employee_directory.size})
+cache_hits = CallbackMetric(
+    "cache_hits_total", "In-process cache hits", ("cache",), "counter",
+    lambda: {("user",): user_cache.hits, ("employee",): employee_directory.hits})
+cache_misses = CallbackMetric(
+    "cache_misses_total", "In-process cache misses", ("cache",), "counter",
+    lambda: {("user",): user_cache.misses, ("employee",): employee_directory.misses})
+live_feed_subscribers = CallbackMetric(
+    "live_feed_subscribers", "Connected clients of the live note feed", (), "gauge",
+    lambda: {(): note_broker.size})
+live_feed_dropped = CallbackMetric(
+    "live_feed_dropped_total", "Live feed subscribers dropped for falling behind", (), "counter",
+    lambda: {(): note_broker.dropped})
+group_commit_size = Histogram(
+    "note_group_commit_size", "Notes written per group commit", (), buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+requests_rejected = Counter(
+    "admission_rejected_total", "Requests rejected with 429 by rate limits and concurrency caps", ("limit",))
+password_jobs = CallbackMetric(
+    "password_hash_jobs_pending", "bcrypt jobs queued or running", (), "gauge",
+    lambda: {(): password_jobs_pending})
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends, labelled by collection and command name.
+
+    Commands sent while a request trace is active are also appended to it. Motor
+    runs the driver in executor threads with a copy of the caller's context, so
+    the listener sees the trace of the request that issued the command.
+    """
+
+    def __init__(self):
+        self._started = {}
+
+    def _key(self, event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        trace = request_trace.get()
+        if trace is not None and trace.stopped:
+            trace = None
+        command = None
+        if trace is not None and event.command_name in EXPLAINABLE_COMMANDS:
+            command = (event.database_name, command_shape(event.command))
+        self._started[self._key(event)] = (target if isinstance(target, str) else "", trace, command)
+
+    def _finished(self, event):
+        collection, trace, command = self._started.pop(self._key(event), ("", None, None))
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        if trace is not None:
+            trace.add(collection, event.command_name, event.duration_micros / 1000, command)
+        return collection
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        collection = self._finished(event)
+        mongo_command_failures.inc(collection, event.command_name)
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks open and checked out connections across all pools of the client."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        mongo_pool_connections.inc("open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongo_pool_connections.inc("open", amount=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        mongo_pool_connections.inc("checked_out")
+
+    def connection_checked_in(self, event):
+        mongo_pool_connections.inc("checked_out", amount=-1)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            http_request_duration.observe(time.perf_counter() - start, scope["method"], path)
+            http_requests_total.inc(scope["method"], path, status_code)
+
+# Profiling
+# Requests carrying PROFILE_TOKEN in an X-Profile header or a profile query
+# parameter are sampled into folded stacks under PROFILE_DIR. Unset disables it.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', str(ROOT_DIR / 'profiles')))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+# Requests slower than this record their Mongo commands and the query plan of
+# the slowest query under PROFILE_DIR; 0 disables the slow request log.
+# Streamed responses (exports, live feed) are never traced.
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '1000'))
+# Commands of a slow request kept for its log, slowest first
+SLOW_REQUEST_MAX_COMMANDS = int(os.environ.get('SLOW_REQUEST_MAX_COMMANDS', '5'))
+# Files kept in PROFILE_DIR; older profiles and slow request logs are deleted
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '200'))
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Session, transaction and concern fields the driver adds, which explain rejects
+NON_EXPLAIN_FIELDS = {"lsid", "txnNumber", "startTransaction", "autocommit", "readConcern", "writeConcern"}
+
+def command_shape(value):
+    """Copy of a command document with value lists and write statements cut to one entry.
+
+    Enough to plan the query again, but independent of the size of `$in` lists
+    and batched writes. Lists of documents such as pipelines and `$or` stay whole.
+    """
+    if isinstance(value, dict):
+        return {
+            key: command_shape(item[:1] if key in ("updates", "deletes") else item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        if not any(isinstance(item, (dict, list, tuple)) for item in value):
+            return list(value[:1])
+        return [command_shape(item) for item in value]
+    return value
+
+class RequestTrace:
+    """Mongo commands of one request: totals per collection and command, and the slowest few.
+
+    Its size does not grow with the number of commands, so long requests stay
+    cheap to trace. `stop()` ends the trace once a response turns out to be streamed.
+    """
+
+    def __init__(self, max_commands: int):
+        self.max_commands = max_commands
+        self.commands = 0
+        self.totals = {}
+        # Min-heap of (duration_ms, sequence, collection, command, (database, shape))
+        self.slowest = []
+        self.stopped = False
+
+    def add(self, collection: str, name: str, duration_ms: float, command):
+        if self.stopped:
+            return
+        self.commands += 1
+        count, total = self.totals.get((collection, name), (0, 0.0))
+        self.totals[(collection, name)] = (count + 1, total + duration_ms)
+        entry = (duration_ms, self.commands, collection, name, command)
+        if len(self.slowest) < self.max_commands:
+            heapq.heappush(self.slowest, entry)
+        elif duration_ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def stop(self):
+        self.stopped = True
+        self.totals.clear()
+        self.slowest.clear()
+
+request_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread.
+
+    The event loop runs every request of the worker, so the samples of a
+    profiled request include whatever else the loop did meanwhile; time spent
+    waiting for MongoDB shows up as the loop's selector.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def folded(self) -> str:
+        """Stacks in the folded format read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+def _write_profile_file(name: str, content: str) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / name
+    path.write_text(content)
+    # Keep the newest PROFILE_MAX_FILES profiles and slow request logs
+    files = sorted(
+        (entry for entry in PROFILE_DIR.iterdir() if entry.name.startswith(("profile-", "slow-"))),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for old in files[PROFILE_MAX_FILES:]:
+        old.unlink(missing_ok=True)
+    return path
+
+async def explain_command(database: str, command: dict) -> dict:
+    """Plan a recorded command again; queryPlanner verbosity never executes it."""
+    command = {key: value for key, value in command.items()
+               if key not in NON_EXPLAIN_FIELDS and not key.startswith("$")}
+    # explain takes a single write statement
+    for statements in ("updates", "deletes"):
+        if statements in command:
+            command[statements] = command[statements][:1]
+    return await client[database].command({"explain": command, "verbosity": "queryPlanner"})
+
+async def record_slow_request(record: dict, trace: RequestTrace):
+    """Write a slow request with its Mongo commands and the query plan of its slowest query."""
+    # This task runs with a copy of the request's context; its own commands stay out of the trace
+    request_trace.set(None)
+    record["mongo_commands"] = trace.commands
+    record["mongo"] = [
+        {"collection": collection, "command": name, "count": count, "duration_ms": round(total, 3)}
+        for (collection, name), (count, total) in trace.totals.items()
+    ]
+    slowest = sorted(trace.slowest, reverse=True)
+    record["slowest"] = [
+        {"collection": collection, "command": name, "duration_ms": round(duration, 3)}
+        for duration, _, collection, name, _ in slowest
+    ]
+    explainable = [
+        entry for entry in slowest
+        if entry[4] is not None and not any(
+            "$out" in stage or "$merge" in stage for stage in entry[4][1].get("pipeline", ())
+        )
+    ]
+    record["explain"] = None
+    if explainable:
+        database, command = explainable[0][4]
+        try:
+            record["explain"] = await explain_command(database, command)
+        except PyMongoError as e:
+            record["explain"] = {"error": str(e)}
+    name = f"slow-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.json"
+    try:
+        path = await asyncio.to_thread(_write_profile_file, name, json_util.dumps(record, indent=2))
+    except OSError as e:
+        logger.error("Could not write slow request log: %s", e)
+        return
+    logger.warning("Slow request %s %s took %.0f ms with %d Mongo commands, see %s",
+                   record["method"], record["route"], record["duration_ms"], trace.commands, path)
+
+slow_request_tasks = set()
+
+class ProfilingMiddleware:
+    """ASGI middleware for opt-in request profiling and the slow request log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _profile_requested(self, scope) -> bool:
+        if not PROFILE_TOKEN:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-profile" and value.decode("latin-1") == PROFILE_TOKEN:
+                return True
+        query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        return query.get("profile") == PROFILE_TOKEN
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (SLOW_REQUEST_MS <= 0 and not PROFILE_TOKEN):
+            await self.app(scope, receive, send)
+            return
+        
+        sampler = None
+        profile_name = None
+        if self._profile_requested(scope):
+            profile_name = f"profile-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.folded"
+            sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        
+        status_code = 500
+        trace = RequestTrace(SLOW_REQUEST_MAX_COMMANDS)
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Exports and the live feed are streamed without a length. They run as
+                # long as the data or the client needs, so they are not traced.
+                if not any(name == b"content-length" for name, _ in message.get("headers", [])):
+                    trace.stop()
+                if profile_name:
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_name.encode())]
+            await send(message)
+        
+        trace_token = request_trace.set(trace)
+        start = time.perf_counter()
+        if sampler:
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            request_trace.reset(trace_token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            if sampler:
+                sampler.stop()
+                try:
+                    written = await asyncio.to_thread(_write_profile_file, profile_name, sampler.folded())
+                    logger.info("Profiled %s %s (%.0f ms) into %s", scope["method"], path, duration_ms, written)
+                except OSError as e:
+                    logger.error("Could not write profile: %s", e)
+            if SLOW_REQUEST_MS > 0 and duration_ms >= SLOW_REQUEST_MS and not trace.stopped:
+                record = {
+                    "at": datetime.now(timezone.utc).isoformat(),
+                    "method": scope["method"],
+                    "route": path,
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 1),
+                }
+                # Planning the query again happens after the response is sent
+                task = asyncio.create_task(record_slow_request(record, trace))
+                slow_request_tasks.add(task)
+                task.add_done_callback(slow_request_tasks.discard)
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Pools are per worker process. Unless MONGO_MAX_POOL_SIZE is set, the
+# connection budget of mongod is split across the WEB_CONCURRENCY workers
+# (the variable uvicorn reads for --workers), capped at the driver default.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+MONGO_CONNECTION_BUDGET = int(os.environ.get('MONGO_CONNECTION_BUDGET', '400'))
+MONGO_MAX_POOL_SIZE = int(os.environ.get(
+    'MONGO_MAX_POOL_SIZE', str(min(100, max(10, MONGO_CONNECTION_BUDGET // max(1, WEB_CONCURRENCY))))))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', str(min(10, MONGO_MAX_POOL_SIZE))))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '0'))  # 0: no timeout
+
+# Created by the lifespan handler of each worker, or by connect_mongo() in scripts
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+def connect_mongo():
+    global client, db
+    client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        tz_aware=True,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS or None,
+        event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()]
+    )
+    db = client[os.environ['DB_NAME']]
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with a different cost than BCRYPT_ROUNDS are transparently rehashed on login
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt runs on its own threads; beyond MAX_PENDING queued jobs requests get a 503
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-app = FastAPI()
-api_router = APIRouter(prefix="/api")
+# Admission control: token buckets per user and per company (requests per second
+# and burst), checked for every authenticated request, and caps on concurrently
+# running logins and exports. Rejections are fast 429s with Retry-After.
+# RATE_LIMIT_BACKEND=mongo shares the buckets between workers via MongoDB.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()
+USER_RATE_LIMIT = float(os.environ.get('USER_RATE_LIMIT', '10'))
+USER_RATE_BURST = float(os.environ.get('USER_RATE_BURST', '50'))
+COMPANY_RATE_LIMIT = float(os.environ.get('COMPANY_RATE_LIMIT', '100'))
+COMPANY_RATE_BURST = float(os.environ.get('COMPANY_RATE_BURST', '500'))
+LOGIN_MAX_CONCURRENT = int(os.environ.get('LOGIN_MAX_CONCURRENT', '32'))
+EXPORT_MAX_CONCURRENT = int(os.environ.get('EXPORT_MAX_CONCURRENT', '4'))
+EXPORT_MAX_CONCURRENT_PER_COMPANY = int(os.environ.get('EXPORT_MAX_CONCURRENT_PER_COMPANY', '1'))
+
+# Group commit: with NOTE_GROUP_COMMIT, notes from concurrent POST /notes calls
+# are collected for up to WINDOW_MS or MAX_DOCS notes and written together
+NOTE_GROUP_COMMIT = os.environ.get('NOTE_GROUP_COMMIT', 'false').lower() == 'true'
+NOTE_GROUP_COMMIT_WINDOW_MS = float(os.environ.get('NOTE_GROUP_COMMIT_WINDOW_MS', '5'))
+NOTE_GROUP_COMMIT_MAX_DOCS = int(os.environ.get('NOTE_GROUP_COMMIT_MAX_DOCS', '100'))
+
+# Authenticated users resolved by get_current_user, keyed by the token subject
+USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', 'true').lower() == 'true'
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+USER_CACHE_MAX_SIZE = int(os.environ.get('USER_CACHE_MAX_SIZE', '10000'))
+
+# Employees resolved by barcode scans and note creation, grouped per company
+EMPLOYEE_CACHE_ENABLED = os.environ.get('EMPLOYEE_CACHE_ENABLED', 'true').lower() == 'true'
+EMPLOYEE_CACHE_TTL_SECONDS = float(os.environ.get('EMPLOYEE_CACHE_TTL_SECONDS', '300'))
+EMPLOYEE_CACHE_MAX_SIZE = int(os.environ.get('EMPLOYEE_CACHE_MAX_SIZE', '50000'))
+
+# Keyset pagination page sizes
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+
+# Largest number of notes accepted by POST /notes/batch
+MAX_NOTE_BATCH_SIZE = int(os.environ.get('MAX_NOTE_BATCH_SIZE', '500'))
+# Scanner timestamps further ahead of the server clock are replaced by the upload time
+MAX_NOTE_CLOCK_SKEW_SECONDS = float(os.environ.get('MAX_NOTE_CLOCK_SKEW_SECONDS', '300'))
+
+# Rows per bulk write of POST /employees/import, and how many row errors are reported
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '1000'))
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+# Changes newer than this may still have lower sequence numbers in flight
+CHANGE_SETTLE_SECONDS = float(os.environ.get('CHANGE_SETTLE_SECONDS', '5'))
+
+# Notes fetched from Mongo and flushed to the client per export chunk; Parquet
+# row groups collect several chunks
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+PARQUET_ROW_GROUP_SIZE = int(os.environ.get('PARQUET_ROW_GROUP_SIZE', '50000'))
+
+# Live note feed: events buffered per subscriber before it is dropped, and the
+# keepalive interval. With NOTES_CHANGE_STREAM (replica sets only) the feed is
+# driven by a change stream, so notes created on any worker reach everyone.
+LIVE_FEED_QUEUE_SIZE = int(os.environ.get('LIVE_FEED_QUEUE_SIZE', '100'))
+LIVE_FEED_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_FEED_HEARTBEAT_SECONDS', '15'))
+# Lifetime of the tickets browsers open the feed with, in place of the login token
+LIVE_FEED_TICKET_SECONDS = int(os.environ.get('LIVE_FEED_TICKET_SECONDS', '60'))
+NOTES_CHANGE_STREAM = os.environ.get('NOTES_CHANGE_STREAM', 'false').lower() == 'true'
+
+# Notes older than NOTE_RETENTION_MONTHS move to notes_archive (0 keeps everything
+# hot). One worker at a time archives every ARCHIVE_INTERVAL_SECONDS, in batches.
+NOTE_RETENTION_MONTHS = int(os.environ.get('NOTE_RETENTION_MONTHS', '0'))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '3600'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '1000'))
+ARCHIVE_PAUSE_SECONDS = float(os.environ.get('ARCHIVE_PAUSE_SECONDS', '0.1'))
+
+# Reports count notes per calendar day in this timezone
+REPORT_TIMEZONE = ZoneInfo(os.environ.get('REPORT_TIMEZONE', 'Europe/Berlin'))
+MAX_REPORT_DAYS = 366
+
+# Index verification: "off", "log" (warn on COLLSCAN) or "strict" (refuse to start)
+INDEX_VERIFICATION = os.environ.get('INDEX_VERIFICATION', 'log').lower()
+
+# Set while this worker is warmed up and not shutting down, see /api/health/ready
+worker_ready = False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global worker_ready, live_feed_task
+    connect_mongo()
+    await provision_indexes()
+    await require_converted_timestamps()
+    await require_note_company_ids()
+    await warm_up()
+    if NOTES_CHANGE_STREAM:
+        live_feed_task = asyncio.create_task(watch_note_inserts())
+    archiver_task = asyncio.create_task(run_note_archiver()) if NOTE_RETENTION_MONTHS > 0 else None
+    worker_ready = True
+    yield
+    worker_ready = False
+    live_feed_closing.set()
+    if live_feed_task is not None:
+        live_feed_task.cancel()
+    if archiver_task is not None:
+        archiver_task.cancel()
+    await note_group_commit.close()
+    client.close()
+    password_executor.shutdown(wait=False)
+
+# Pydantic writes UTC datetimes with a Z suffix, orjson by default with +00:00
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+class UTCJSONResponse(ORJSONResponse):
+    """ORJSONResponse that formats datetimes like the pydantic-validated responses."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | ORJSON_OPTIONS)
+
+app = FastAPI(lifespan=lifespan)
+api_router = APIRouter(prefix="/api", default_response_class=UTCJSONResponse)
+
+logger = logging.getLogger(__name__)
+
+# Indexes
+INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "companies": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "employees": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("company_id", ASCENDING), ("employee_number", ASCENDING)],
+            name="company_employee_number_unique",
+            unique=True,
+        ),
+        IndexModel([("company_id", ASCENDING), ("change_seq", ASCENDING)], name="company_change_seq"),
+    ],
+    "notes": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("employee_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="employee_timestamp_id",
+        ),
+        IndexModel(
+            [("company_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="company_timestamp_id",
+        ),
+        IndexModel(
+            [("company_id", ASCENDING), ("idempotency_key", ASCENDING)],
+            name="company_idempotency_key_unique",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$exists": True}},
+        ),
+        IndexModel([("company_id", ASCENDING), ("change_seq", ASCENDING)], name="company_change_seq"),
+        # The company_id prefix keeps searches within one company's entries of the index
+        IndexModel(
+            [("company_id", ASCENDING), ("note_text", TEXT)],
+            name="company_note_text",
+            default_language="german",
+        ),
+    ],
+    # Only what reads with include_archive need
+    "notes_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("employee_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="employee_timestamp_id",
+        ),
+        IndexModel(
+            [("company_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="company_timestamp_id",
+        ),
+    ],
+    "note_rollups": [
+        IndexModel([("company_id", ASCENDING), ("day", ASCENDING)], name="company_day"),
+        IndexModel([("day", ASCENDING)], name="day"),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Representative query of every hot endpoint, checked with explain() at startup
+QUERY_PLAN_CHECKS = [
+    ("get_current_user", "users", {"id": "-"}, None),
+    ("login", "users", {"email": "-"}, None),
+    ("get_company", "companies", {"id": "-"}, None),
+    ("get_employees", "employees", {"company_id": "-"}, [("employee_number", ASCENDING)]),
+    ("get_employee", "employees", {"id": "-", "company_id": "-"}, None),
+    ("get_employee_by_number", "employees", {"employee_number": "-", "company_id": "-"}, None),
+    ("get_notes", "notes", {"company_id": "-"}, [("timestamp", DESCENDING), ("id", DESCENDING)]),
+    ("get_employee_notes", "notes", {"employee_id": "-"}, [("timestamp", DESCENDING), ("id", DESCENDING)]),
+    ("get_employee_notes_archive", "notes_archive", {"employee_id": "-"}, [("timestamp", DESCENDING), ("id", DESCENDING)]),
+    ("get_note_changes", "notes", {"company_id": "-", "change_seq": {"$gt": 0}}, [("change_seq", ASCENDING)]),
+    ("get_employee_changes", "employees", {"company_id": "-", "change_seq": {"$gt": 0}}, [("change_seq", ASCENDING)]),
+    ("search_notes", "notes", {"company_id": "-", "$text": {"$search": "-"}}, None),
+    ("get_note_report", "note_rollups", {"company_id": "-", "day": {"$gte": "-", "$lte": "-"}}, None),
+]
+
+def _index_key(key: dict) -> tuple:
+    """Key of a declared index as index_information() reports it."""
+    fields = []
+    for field, kind in key.items():
+        # The server stores all text fields of an index as _fts/_ftsx
+        if kind == TEXT:
+            if ("_fts", TEXT) not in fields:
+                fields += [("_fts", TEXT), ("_ftsx", 1)]
+        else:
+            fields.append((field, kind))
+    return tuple(fields)
+
+async def ensure_indexes():
+    """Create every declared index that does not exist yet (idempotent)."""
+    for collection, indexes in INDEXES.items():
+        existing = {tuple(info["key"]) for info in (await db[collection].index_information()).values()}
+        missing = [index for index in indexes if _index_key(index.document["key"]) not in existing]
+        for index in missing:
+            name = index.document["name"]
+            try:
+                await db[collection].create_indexes([index])
+            except DuplicateKeyError as exc:
+                # Data written before the index existed; the service runs without the constraint
+                logger.error(
+                    "Could not create unique index %s on %s, existing documents collide: %s. "
+                    "Remove the duplicates (see DEPLOYMENT.md) and restart.",
+                    name, collection, exc
+                )
+                continue
+            logger.info("Created index %s on %s", name, collection)
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+async def verify_query_plans() -> List[str]:
+    """Explain every hot query and return the names of those that fall back to a COLLSCAN."""
+    regressions = []
+    for name, collection, query, sort in QUERY_PLAN_CHECKS:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation["queryPlanner"]["winningPlan"]
+        # Newer servers wrap the classic plan when the slot based engine is used
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            regressions.append(name)
+    return regressions
+
+# Migrations
+async def backfill_note_company_ids(batch_size: int = 500, pause: float = 0.0) -> int:
+    """Copy each employee's company_id onto their notes that predate the field.
+
+    Runs online: employees are processed in batches of unordered UpdateMany
+    operations that only touch notes still missing the field, so the command can
+    be interrupted and re-run at any time.
+    """
+    updated = 0
+    operations = []
+    async for employee in db.employees.find({}, {"_id": 0, "id": 1, "company_id": 1}):
+        operations.append(UpdateMany(
+            {"employee_id": employee["id"], "company_id": {"$exists": False}},
+            {"$set": {"company_id": employee["company_id"]}}
+        ))
+        if len(operations) >= batch_size:
+            result = await db.notes.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+            if pause:
+                await asyncio.sleep(pause)
+    if operations:
+        result = await db.notes.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    if not await has_notes_without_company():
+        await mark_migration_completed("backfill_note_company_ids")
+    return updated
+
+async def has_notes_without_company() -> bool:
+    """Whether a note of an existing employee still lacks company_id.
+
+    Notes of deleted employees cannot be backfilled and are ignored.
+    """
+    employee_ids = await db.notes.distinct("employee_id", {"company_id": {"$exists": False}})
+    if not employee_ids:
+        return False
+    return await db.employees.find_one({"id": {"$in": employee_ids}}, {"_id": 1}) is not None
+
+async def require_note_company_ids():
+    """Refuse to start while notes may still lack company_id.
+
+    Listings, exports, rollups and the archiver all filter on company_id, so
+    such notes would silently disappear. Works like require_converted_timestamps.
+    """
+    if await db.migrations.find_one({"_id": "backfill_note_company_ids"}):
+        return
+    if await has_notes_without_company():
+        raise RuntimeError(
+            "Notes without company_id found; stop the previous version and "
+            "run 'python manage.py backfill-note-company-ids' before starting this one"
+        )
+    await mark_migration_completed("backfill_note_company_ids")
+
+# Fields written as ISO strings by earlier versions
+DATETIME_FIELDS = {
+    "users": ["created_at"],
+    "companies": ["created_at"],
+    "employees": ["created_at"],
+    "notes": ["timestamp", "created_at"],
+}
+
+async def convert_string_timestamps(batch_size: int = 1000, pause: float = 0.0) -> int:
+    """Rewrite ISO string timestamps as native BSON dates, in batches.
+
+    Each update is conditional on the field still holding the string that was
+    read, so concurrent writers are never overwritten and re-runs are no-ops.
+    """
+    converted = 0
+    for collection, fields in DATETIME_FIELDS.items():
+        for field in fields:
+            operations = []
+            async for doc in db[collection].find({field: {"$type": "string"}}, {field: 1}):
+                operations.append(UpdateOne(
+                    {"_id": doc["_id"], field: doc[field]},
+                    {"$set": {field: as_utc(datetime.fromisoformat(doc[field]))}}
+                ))
+                if len(operations) >= batch_size:
+                    result = await db[collection].bulk_write(operations, ordered=False)
+                    converted += result.modified_count
+                    operations = []
+                    if pause:
+                        await asyncio.sleep(pause)
+            if operations:
+                result = await db[collection].bulk_write(operations, ordered=False)
+                converted += result.modified_count
+    if not await has_string_timestamps():
+        await mark_migration_completed("convert_timestamps")
+    return converted
+
+async def has_string_timestamps() -> bool:
+    for collection, fields in DATETIME_FIELDS.items():
+        for field in fields:
+            if await db[collection].find_one({field: {"$type": "string"}}, {"_id": 1}):
+                return True
+    return False
+
+async def mark_migration_completed(name: str):
+    await db.migrations.update_one(
+        {"_id": name},
+        {"$setOnInsert": {"completed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+async def require_converted_timestamps():
+    """Refuse to start while notes may still hold string timestamps.
+
+    Keyset pages and exports compare timestamps as dates, so string values
+    would silently drop out of listings. Once no string is left (or on a new
+    database) a marker is stored and later starts only read the marker.
+    """
+    if await db.migrations.find_one({"_id": "convert_timestamps"}):
+        return
+    if await has_string_timestamps():
+        raise RuntimeError(
+            "Timestamps are still stored as strings; stop the previous version and "
+            "run 'python manage.py convert-timestamps' before starting this one"
+        )
+    await mark_migration_completed("convert_timestamps")
+
+# Archiving
+WORKER_ID = str(uuid.uuid4())
+
+def months_before(value: datetime, months: int) -> datetime:
+    month = value.month - 1 - months
+    year = value.year + month // 12
+    month = month % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+async def acquire_lease(name: str, seconds: float) -> bool:
+    """Take the named lease for `seconds` unless another worker holds it."""
+    now = datetime.now(timezone.utc)
+    try:
+        # A held lease does not match, so the upsert collides with its _id
+        await db.leases.find_one_and_update(
+            {"_id": name, "expires_at": {"$lte": now}},
+            {"$set": {"expires_at": now + timedelta(seconds=seconds), "holder": WORKER_ID}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def archive_old_notes(months: int, batch_size: int = 1000, pause: float = 0.0) -> int:
+    """Move notes with a timestamp older than `months` into notes_archive, company by company.
+
+    Each batch is upserted into the archive before it is deleted from notes, so
+    an interrupted run leaves at most one batch in both tiers (merged reads skip
+    the duplicates) and the next run completes it.
+    """
+    cutoff = months_before(datetime.now(timezone.utc), months)
+    moved = 0
+    async for company in db.companies.find({}, {"_id": 0, "id": 1}):
+        query = {"company_id": company["id"], "timestamp": {"$lt": cutoff}}
+        while True:
+            docs = await db.notes.find(query).sort(
+                [("timestamp", ASCENDING), ("id", ASCENDING)]
+            ).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            await db.notes_archive.bulk_write(
+                [ReplaceOne({"id": doc["id"]}, doc, upsert=True) for doc in docs], ordered=False
+            )
+            result = await db.notes.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            moved += result.deleted_count
+            # Pages without the archive no longer contain these notes
+            await bump_note_versions(company["id"], docs)
+            if pause:
+                await asyncio.sleep(pause)
+    return moved
+
+async def run_note_archiver():
+    while True:
+        try:
+            if await acquire_lease("archive_notes", ARCHIVE_INTERVAL_SECONDS):
+                moved = await archive_old_notes(NOTE_RETENTION_MONTHS, ARCHIVE_BATCH_SIZE, ARCHIVE_PAUSE_SECONDS)
+                if moved:
+                    logger.info("Archived %d notes older than %d months", moved, NOTE_RETENTION_MONTHS)
+        except PyMongoError as exc:
+            logger.warning("Archiving notes failed: %s", exc)
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+async def provision_indexes():
+    await ensure_indexes()
+    if INDEX_VERIFICATION == "off":
+        return
+    regressions = await verify_query_plans()
+    if not regressions:
+        return
+    message = f"Queries without index (COLLSCAN): {', '.join(regressions)}"
+    if INDEX_VERIFICATION == "strict":
+        raise RuntimeError(message)
+    logger.warning(message)
 
 # Models
 class Company(BaseModel):
@@ -67,6 +1051,10 @@ class Token(BaseModel):
     token_type: str = "bearer"
     user: User
 
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
 class Employee(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -92,40 +1080,951 @@ class NoteCreate(BaseModel):
     employee_id: str
     note_text: str
 
+class EmployeeImportError(BaseModel):
+    row: int
+    detail: str
+
+class EmployeeImportSummary(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    superseded: int = 0  # Rows overridden by a later row with the same employee number
+    rejected: int = 0
+    errors: List[EmployeeImportError] = []  # First IMPORT_MAX_REPORTED_ERRORS rejected rows
+
+class EmployeePage(BaseModel):
+    items: List[Employee]
+    next_cursor: Optional[str] = None
+
+class NotePage(BaseModel):
+    items: List[Note]
+    next_cursor: Optional[str] = None
+
+class JoinedNote(Note):
+    employee_name: Optional[str] = None
+    employee_number: Optional[str] = None
+
+class NoteSearchResult(JoinedNote):
+    score: float  # Text relevance, results are ordered by it
+
+class NoteSearchPage(BaseModel):
+    items: List[NoteSearchResult]
+    next_cursor: Optional[str] = None
+
+class NoteReportDay(BaseModel):
+    day: str  # YYYY-MM-DD in REPORT_TIMEZONE
+    count: int
+
+class NoteReportEmployee(BaseModel):
+    employee_id: str
+    employee_name: Optional[str] = None
+    employee_number: Optional[str] = None
+    count: int
+
+class NoteReportUser(BaseModel):
+    user_id: str
+    email: Optional[str] = None
+    count: int
+
+class NoteReport(BaseModel):
+    start: str
+    end: str
+    total: int
+    days: List[NoteReportDay]  # Every day of the range, oldest first
+    employees: List[NoteReportEmployee]  # Most notes first
+    users: List[NoteReportUser]  # Most notes first
+
+class DashboardSummary(BaseModel):
+    user: User
+    employee_count: int
+    recent_notes: List[JoinedNote]  # Newest first
+    notes_next_cursor: Optional[str] = None  # Continues recent_notes via GET /notes
+    notes_token: str  # Watermark for GET /notes/changes, taken before recent_notes
+    days: List[NoteReportDay]  # Notes per day, oldest first, ending today
+
+class EmployeeChanges(BaseModel):
+    items: List[Employee]  # Created or modified employees, oldest change first
+    next_token: str
+    has_more: bool
+
+class NoteChanges(BaseModel):
+    items: List[Note]  # Created notes, oldest first
+    next_token: str
+    has_more: bool
+
+class NoteBatchItem(BaseModel):
+    employee_id: str
+    note_text: str
+    timestamp: Optional[datetime] = None  # When the note was taken on the scanner
+    idempotency_key: Optional[str] = None  # Client-generated, unique per company
+
+class NoteBatchCreate(BaseModel):
+    notes: List[NoteBatchItem] = Field(..., min_length=1, max_length=MAX_NOTE_BATCH_SIZE)
+
+class NoteBatchResult(BaseModel):
+    index: int
+    status: str  # 'created', 'duplicate' or 'rejected'
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+class NoteBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    rejected: int
+    results: List[NoteBatchResult]
+
+# Warmup
+async def warm_employee_directory():
+    """Preload the employees of the companies that took notes today or yesterday."""
+    since = report_day(datetime.now(timezone.utc) - timedelta(days=1))
+    company_ids = []
+    async for rollup in db.note_rollups.find({"day": {"$gte": since}}, {"_id": 0, "company_id": 1, "count": 1}):
+        company_ids.append((rollup.get("count", 0), rollup["company_id"]))
+    # Busiest companies first; leave half of the directory for everyone else
+    loaded = set()
+    for _, company_id in sorted(company_ids, reverse=True):
+        if company_id in loaded or employee_directory.size >= EMPLOYEE_CACHE_MAX_SIZE // 2:
+            continue
+        loaded.add(company_id)
+        async for doc in db.employees.find({"company_id": company_id}, EMPLOYEE_PROJECTION):
+            employee_directory.put(Employee(**doc))
+    return len(loaded)
+
+async def warm_up():
+    """Open the minimum pool and fill the caches before the worker takes requests."""
+    started = time.perf_counter()
+    # Concurrent pings each check out a connection, so the pool opens them up front
+    await asyncio.gather(*(db.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)))
+    companies = await warm_employee_directory() if EMPLOYEE_CACHE_ENABLED else 0
+    logger.info(
+        "Warmed up in %.2fs: %d MongoDB connections, employees of %d companies",
+        time.perf_counter() - started, mongo_pool_connections.get("open"), companies
+    )
+
+# Time utilities
+def as_utc(value: datetime) -> datetime:
+    """Interpret naive datetimes from clients as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+# Response utilities
+def model_projection(model) -> dict:
+    """Mongo projection returning exactly the fields of a response model."""
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+COMPANY_PROJECTION = model_projection(Company)
+EMPLOYEE_PROJECTION = model_projection(Employee)
+NOTE_PROJECTION = model_projection(Note)
+
+# Joins notes in an aggregation with their employee, for JoinedNote results
+EMPLOYEE_LOOKUP = {"$lookup": {"from": "employees", "localField": "employee_id", "foreignField": "id", "as": "employee"}}
+JOINED_NOTE_PROJECTION = {
+    **NOTE_PROJECTION,
+    "employee_name": {"$ifNull": [{"$arrayElemAt": ["$employee.name", 0]}, None]},
+    "employee_number": {"$ifNull": [{"$arrayElemAt": ["$employee.employee_number", 0]}, None]},
+}
+
+def trusted_response(content, headers: Optional[dict] = None) -> UTCJSONResponse:
+    """Serialize documents we wrote ourselves straight to JSON.
+
+    Returning a Response makes FastAPI skip re-validating `content` against the
+    route's response_model (which stays in place for the OpenAPI schema), so the
+    content must already match it, e.g. by reading it with model_projection().
+    """
+    return UTCJSONResponse(content, headers=headers)
+
+# Change tracking
+async def stamp_changes(kind: str, company_id: str, docs: List[dict]):
+    """Assign the next per-company change sequence numbers of `kind` to `docs`.
+
+    Every write that creates or modifies a document synced by a /changes
+    endpoint stamps it, so clients can ask for everything after a watermark.
+    """
+    if not docs:
+        return
+    counter = await db.counters.find_one_and_update(
+        {"_id": f"{kind}:{company_id}"},
+        {"$inc": {"seq": len(docs)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first = counter["seq"] - len(docs) + 1
+    changed_at = datetime.now(timezone.utc)
+    for offset, doc in enumerate(docs):
+        doc["change_seq"] = first + offset
+        doc["changed_at"] = changed_at
+
+async def current_change_seq(kind: str, company_id: str) -> int:
+    counter = await db.counters.find_one({"_id": f"{kind}:{company_id}"})
+    return counter["seq"] if counter else 0
+
+# Conditional requests
+# Version counters behind the ETags of read endpoints. Unlike change sequences
+# they are bumped after the write, so a body is never older than its ETag.
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+def company_version_key(company_id: str) -> str:
+    """Covers the company and its employees."""
+    return f"version:{company_id}"
+
+def notes_version_key(company_id: str, employee_id: str) -> str:
+    """Covers the notes of one employee, current and archived."""
+    return f"version:{company_id}:{employee_id}"
+
+async def bump_versions(keys: List[str]):
+    if keys:
+        await db.counters.bulk_write(
+            [UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in keys], ordered=False
+        )
+
+async def bump_note_versions(company_id: str, docs: List[dict]):
+    await bump_versions([notes_version_key(company_id, employee_id) for employee_id in {doc["employee_id"] for doc in docs}])
+
+async def version_etag(key: str) -> Optional[str]:
+    """ETag of the version counter `key`, None before its first bump.
+
+    Only writes create a counter, so without one nothing shows the resource
+    exists: such responses carry no ETag and are never answered with a 304.
+    """
+    counter = await db.counters.find_one({"_id": key}, {"version": 1})
+    return f'W/"{key}:{counter["version"]}"' if counter else None
+
+def etag_headers(etag: Optional[str]) -> Optional[dict]:
+    if etag is None:
+        return None
+    # no-cache lets browsers keep the body but revalidate it on every use
+    return {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """A 304 for requests whose If-None-Match already names `etag`, compared weakly."""
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+def decode_change_token(token: str) -> int:
+    try:
+        seq = int(token)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid change token")
+    if seq < 0:
+        raise HTTPException(status_code=400, detail="Invalid change token")
+    return seq
+
+async def fetch_changes(collection: str, kind: str, company_id: str, since: Optional[str], limit: int, projection: dict) -> dict:
+    """Return the documents changed after the `since` watermark, oldest first.
+
+    Without `since` only the current watermark is returned: clients fetch it
+    before their initial full load and poll with it afterwards.
+    """
+    if since is None:
+        seq = await current_change_seq(kind, company_id)
+        return {"items": [], "next_token": str(seq), "has_more": False}
+    
+    watermark = decode_change_token(since)
+    docs = await db[collection].find(
+        {"company_id": company_id, "change_seq": {"$gt": watermark}},
+        {**projection, "change_seq": 1, "changed_at": 1}
+    ).sort("change_seq", ASCENDING).limit(limit).to_list(limit)
+    
+    # Sequence numbers are allocated before the write lands, so a missing number
+    # may belong to a write that is still in flight. Stop in front of such a gap
+    # until it is older than CHANGE_SETTLE_SECONDS (then the write has failed or
+    # was a rejected duplicate and the number is skipped for good).
+    settled = datetime.now(timezone.utc) - timedelta(seconds=CHANGE_SETTLE_SECONDS)
+    items = []
+    for doc in docs:
+        if doc["change_seq"] != watermark + 1 and doc["changed_at"] > settled:
+            break
+        watermark = doc.pop("change_seq")
+        doc.pop("changed_at")
+        items.append(doc)
+    
+    return {
+        "items": items,
+        "next_token": str(watermark),
+        "has_more": len(items) == limit
+    }
+
+# Pagination utilities
+def encode_cursor(values: list) -> str:
+    # Extended JSON keeps datetimes typed across the round trip
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+# Types a cursor may hold per sort field. Cursors come from clients, and anything
+# else (e.g. a {"$ne": null} document) would run as a query operator.
+CURSOR_FIELD_TYPES = {
+    "timestamp": datetime,
+    "id": str,
+    "employee_number": str,
+    "score": float,
+}
+
+def decode_cursor(cursor: str, sort_fields: List[str]) -> list:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort_fields):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    for field, value in zip(sort_fields, values):
+        if not isinstance(value, CURSOR_FIELD_TYPES[field]):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+async def fetch_page(collection: str, query: dict, projection: dict, sort_fields: List[str], direction: int, limit: int, cursor: Optional[str]) -> dict:
+    """Return one keyset page ordered by one or two sort fields, the last of which is unique.
+
+    The cursor holds the sort values of the previous page's last document, so the
+    next page is an index range scan that starts right after it instead of a skip.
+    """
+    if cursor:
+        values = decode_cursor(cursor, sort_fields)
+        op = "$lt" if direction == DESCENDING else "$gt"
+        if len(sort_fields) == 1:
+            query = {**query, sort_fields[0]: {op: values[0]}}
+        else:
+            first, second = sort_fields
+            first_value, second_value = values
+            query = {**query, "$or": [
+                {first: {op: first_value}},
+                {first: first_value, second: {op: second_value}},
+            ]}
+    
+    docs = await db[collection].find(query, projection).sort(
+        [(field, direction) for field in sort_fields]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1][field] for field in sort_fields])
+    
+    return {"items": docs, "next_cursor": next_cursor}
+
+async def fetch_tiered_page(query: dict, limit: int, cursor: Optional[str], include_archive: bool) -> dict:
+    """fetch_page() over notes, merged with the same keyset page of notes_archive."""
+    sort_fields = ["timestamp", "id"]
+    page = await fetch_page("notes", query, NOTE_PROJECTION, sort_fields, DESCENDING, limit, cursor)
+    if not include_archive:
+        return page
+    archived = await fetch_page("notes_archive", query, NOTE_PROJECTION, sort_fields, DESCENDING, limit, cursor)
+    
+    merged = {}
+    for doc in page["items"] + archived["items"]:
+        merged[doc["id"]] = doc
+    docs = sorted(merged.values(), key=lambda doc: (doc["timestamp"], doc["id"]), reverse=True)
+    next_cursor = None
+    if len(docs) > limit or page["next_cursor"] or archived["next_cursor"]:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1][field] for field in sort_fields])
+    return {"items": docs, "next_cursor": next_cursor}
+
+# Caches
+class TTLCache:
+    """In-process LRU mapping whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+user_cache = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+def invalidate_cached_user(user_id: str):
+    """Call whenever a user document is created or modified."""
+    user_cache.invalidate(user_id)
+
+class EmployeeDirectory:
+    """Per-company maps from employee number and id to a ready-built Employee.
+
+    Companies are filled lazily, one employee per lookup miss. When the total
+    number of entries exceeds `max_size` the least recently used company is
+    evicted as a whole (or, if only one company is left, its oldest entries).
+    Misses are never cached, so employees created by another worker are still
+    found in the database.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        # company_id -> (number -> (employee, expires_at), id -> number)
+        self._companies = OrderedDict()
+
+    def _lookup(self, company_id: str, employee_number: Optional[str]) -> Optional[Employee]:
+        company = self._companies.get(company_id)
+        entry = company[0].get(employee_number) if company and employee_number is not None else None
+        if entry is not None:
+            employee, expires_at = entry
+            if expires_at > time.monotonic():
+                self._companies.move_to_end(company_id)
+                self.hits += 1
+                return employee
+            self._remove(company_id, employee_number)
+        self.misses += 1
+        return None
+
+    def get_by_number(self, company_id: str, employee_number: str) -> Optional[Employee]:
+        return self._lookup(company_id, employee_number)
+
+    def get_by_id(self, company_id: str, employee_id: str) -> Optional[Employee]:
+        company = self._companies.get(company_id)
+        return self._lookup(company_id, company[1].get(employee_id) if company else None)
+
+    def put(self, employee: Employee):
+        company = self._companies.get(employee.company_id)
+        if company:
+            by_number, by_id = company
+            # An import can move the employee to another number, or the number to another employee
+            old_number = by_id.get(employee.id)
+            if old_number is not None and old_number != employee.employee_number:
+                self._remove(employee.company_id, old_number)
+            entry = by_number.get(employee.employee_number)
+            if entry is not None and entry[0].id != employee.id:
+                self._remove(employee.company_id, employee.employee_number)
+        by_number, by_id = self._companies.setdefault(employee.company_id, (OrderedDict(), {}))
+        if employee.employee_number not in by_number:
+            self.size += 1
+        by_number[employee.employee_number] = (employee, time.monotonic() + self.ttl)
+        by_number.move_to_end(employee.employee_number)
+        by_id[employee.id] = employee.employee_number
+        self._companies.move_to_end(employee.company_id)
+        self._evict()
+
+    def invalidate_company(self, company_id: str):
+        company = self._companies.pop(company_id, None)
+        if company:
+            self.size -= len(company[0])
+
+    def clear(self):
+        self._companies.clear()
+        self.size = 0
+
+    def _remove(self, company_id: str, employee_number: str):
+        by_number, by_id = self._companies[company_id]
+        employee, _ = by_number.pop(employee_number)
+        by_id.pop(employee.id, None)
+        self.size -= 1
+        if not by_number:
+            del self._companies[company_id]
+
+    def _evict(self):
+        while self.size > self.max_size:
+            if len(self._companies) > 1:
+                self.invalidate_company(next(iter(self._companies)))
+            else:
+                company_id, (by_number, _) = next(iter(self._companies.items()))
+                self._remove(company_id, next(iter(by_number)))
+
+employee_directory = EmployeeDirectory(EMPLOYEE_CACHE_MAX_SIZE, EMPLOYEE_CACHE_TTL_SECONDS)
+
+async def get_company_employee(company_id: str, employee_id: Optional[str] = None, employee_number: Optional[str] = None) -> Optional[Employee]:
+    """Resolve an employee of a company by id or number, through the employee directory."""
+    if EMPLOYEE_CACHE_ENABLED:
+        if employee_id is not None:
+            employee = employee_directory.get_by_id(company_id, employee_id)
+        else:
+            employee = employee_directory.get_by_number(company_id, employee_number)
+        if employee is not None:
+            return employee
+    
+    query = {"company_id": company_id}
+    if employee_id is not None:
+        query["id"] = employee_id
+    else:
+        query["employee_number"] = employee_number
+    doc = await db.employees.find_one(query, {"_id": 0})
+    if not doc:
+        return None
+    
+    employee = Employee(**doc)
+    if EMPLOYEE_CACHE_ENABLED:
+        employee_directory.put(employee)
+    return employee
+
+# Live feed
+class Subscription:
+    def __init__(self, company_id: str, queue_size: int):
+        self.company_id = company_id
+        self.queue = asyncio.Queue(queue_size)
+        self.dropped = False
+
+class NoteBroker:
+    """In-process pub/sub of new notes, fanned out to the subscribers of their company.
+
+    Each event is serialized once and shared by all subscribers. A subscriber
+    whose queue is full is dropped rather than buffered without bound; its
+    client reconnects and catches up through /notes/changes.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscriptions: Dict[str, set] = {}
+
+    def subscribe(self, company_id: str) -> Subscription:
+        subscription = Subscription(company_id, self.queue_size)
+        self._subscriptions.setdefault(company_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.company_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.company_id]
+
+    def publish(self, company_id: str, docs: List[dict]):
+        subscriptions = self._subscriptions.get(company_id)
+        if not subscriptions or not docs:
+            return
+        events = [format_note_event(doc) for doc in docs]
+        for subscription in list(subscriptions):
+            for event in events:
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscription.dropped = True
+                    self.dropped += 1
+                    self.unsubscribe(subscription)
+                    break
+
+    @property
+    def size(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+note_broker = NoteBroker(LIVE_FEED_QUEUE_SIZE)
+live_feed_task: Optional[asyncio.Task] = None
+# Set when the worker shuts down, which ends every open feed
+live_feed_closing = asyncio.Event()
+
+def format_note_event(doc: dict) -> bytes:
+    note = {field: doc[field] for field in Note.model_fields}
+    return b"event: note\ndata: " + orjson.dumps(note, option=ORJSON_OPTIONS) + b"\n\n"
+
+def publish_created_notes(company_id: str, docs: List[dict]):
+    """Announce stored notes on the live feed, unless the change stream does it."""
+    if not NOTES_CHANGE_STREAM:
+        note_broker.publish(company_id, docs)
+
+async def watch_note_inserts():
+    """Feed the broker from a change stream on notes, resuming after errors."""
+    pipeline = [
+        {"$match": {"operationType": "insert"}},
+        {"$project": {
+            "fullDocument.company_id": 1,
+            **{f"fullDocument.{field}": 1 for field in Note.model_fields}
+        }}
+    ]
+    resume_token = None
+    while True:
+        try:
+            async with db.notes.watch(pipeline, resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    doc = change["fullDocument"]
+                    note_broker.publish(doc["company_id"], [doc])
+        except PyMongoError as exc:
+            logger.warning("Note change stream failed, resuming in 5s: %s", exc)
+            await asyncio.sleep(5)
+
+# Reporting rollups
+# One document per company and day: {_id: "<company_id>:<day>", company_id, day,
+# count, employees: {employee_id: count}, users: {user_id: count}}
+def report_day(timestamp: datetime) -> str:
+    return as_utc(timestamp).astimezone(REPORT_TIMEZONE).date().isoformat()
+
+async def record_note_rollups(company_id: str, docs: List[dict]):
+    """Count stored notes into the day rollups of their company."""
+    increments = {}
+    for doc in docs:
+        inc = increments.setdefault(report_day(doc["timestamp"]), {})
+        inc["count"] = inc.get("count", 0) + 1
+        for key in (f"employees.{doc['employee_id']}", f"users.{doc['user_id']}"):
+            inc[key] = inc.get(key, 0) + 1
+    if not increments:
+        return
+    await db.note_rollups.bulk_write([
+        UpdateOne(
+            {"_id": f"{company_id}:{day}"},
+            {"$inc": inc, "$setOnInsert": {"company_id": company_id, "day": day}},
+            upsert=True
+        )
+        for day, inc in increments.items()
+    ], ordered=False)
+
+async def on_notes_created(company_id: str, docs: List[dict], versions_bumped: bool = False):
+    """Everything that follows a successful insert of notes.
+
+    The notes are stored by now, so a failure here is only logged: failing the
+    request would make scanners retry and store the notes twice.
+    """
+    follow_ups = [record_note_rollups(company_id, docs)]
+    if not versions_bumped:
+        follow_ups.append(bump_note_versions(company_id, docs))
+    results = await asyncio.gather(*follow_ups, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Follow-up of %d new notes failed; rebuild the note rollups", len(docs), exc_info=result)
+    publish_created_notes(company_id, docs)
+
+def _rollup_pipeline(match: dict, field: str, group_key: str) -> list:
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp", "timezone": REPORT_TIMEZONE.key}}
+    return [
+        {"$match": match},
+        {"$unionWith": {"coll": "notes_archive", "pipeline": [{"$match": match}]}},
+        {"$group": {
+            "_id": {"company_id": "$company_id", "day": day, "key": f"${group_key}"},
+            "count": {"$sum": 1}
+        }},
+        {"$group": {
+            "_id": {"company_id": "$_id.company_id", "day": "$_id.day"},
+            "count": {"$sum": "$count"},
+            field: {"$push": {"k": "$_id.key", "v": "$count"}}
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.company_id", ":", "$_id.day"]},
+            "company_id": "$_id.company_id",
+            "day": "$_id.day",
+            "count": 1,
+            field: {"$arrayToObject": f"${field}"}
+        }},
+    ]
+
+async def rebuild_note_rollups(company_id: Optional[str] = None) -> int:
+    """Recompute the rollups from both note tiers with server-side aggregations.
+
+    Notes created while the rebuild runs may be counted twice or not at all,
+    so run it when the company is idle. Returns the number of day documents.
+    """
+    match = {"company_id": company_id} if company_id else {"company_id": {"$exists": True}}
+    await db.note_rollups.delete_many(match)
+    # The employee pass writes whole documents, the user pass adds its counts
+    employees = _rollup_pipeline(match, "employees", "employee_id")
+    employees.append({"$merge": {"into": "note_rollups", "on": "_id", "whenMatched": "replace"}})
+    await db.notes.aggregate(employees, allowDiskUse=True).to_list(None)
+    users = _rollup_pipeline(match, "users", "user_id")
+    users[-1]["$project"].pop("count")
+    users.append({"$merge": {"into": "note_rollups", "on": "_id", "whenMatched": "merge"}})
+    await db.notes.aggregate(users, allowDiskUse=True).to_list(None)
+    return await db.note_rollups.count_documents(match)
+
+# Group commit
+class NoteGroupCommit:
+    """Write-behind batcher that turns concurrent single-note inserts into one insert_many.
+
+    insert() returns only after the note's batch was acknowledged by MongoDB and
+    raises if the note itself could not be written. Change stamping, rollups and
+    the live feed run once per company and batch instead of once per note.
+    """
+
+    def __init__(self, window: float, max_docs: int):
+        self.window = window
+        self.max_docs = max_docs
+        self._pending = []
+        self._timer = None
+        self._flushes = set()
+
+    async def insert(self, doc: dict):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, future))
+        if len(self._pending) >= self.max_docs:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: list):
+        docs = [doc for doc, _ in batch]
+        group_commit_size.observe(len(docs))
+        errors = {}
+        try:
+            by_company = {}
+            for doc in docs:
+                by_company.setdefault(doc["company_id"], []).append(doc)
+            for company_id, company_docs in by_company.items():
+                await stamp_changes("notes", company_id, company_docs)
+            await db.notes.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details["writeErrors"]:
+                errors[error["index"]] = WriteError(error.get("errmsg", "Write failed"), error.get("code"), error)
+        except Exception as exc:
+            errors = {index: exc for index in range(len(docs))}
+        
+        written = {}
+        for index, (doc, _) in enumerate(batch):
+            if index not in errors:
+                written.setdefault(doc["company_id"], []).append(doc)
+        # Callers revalidate their lists right after the insert returns, so the
+        # versions are bumped first; rollups and the live feed can follow
+        bumps = await asyncio.gather(
+            *(bump_note_versions(company_id, company_docs) for company_id, company_docs in written.items()),
+            return_exceptions=True
+        )
+        for result in bumps:
+            if isinstance(result, Exception):
+                logger.error("Bumping note versions after a group commit failed", exc_info=result)
+        
+        for index, (doc, future) in enumerate(batch):
+            # A caller whose request was cancelled no longer waits for its future
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
+        for company_id, company_docs in written.items():
+            await on_notes_created(company_id, company_docs, versions_bumped=True)
+
+    async def close(self):
+        """Write everything still pending; called on shutdown."""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+note_group_commit = NoteGroupCommit(NOTE_GROUP_COMMIT_WINDOW_MS / 1000, NOTE_GROUP_COMMIT_MAX_DOCS)
+
+# Admission control
+class TokenBucketLimiter:
+    """In-process token buckets: `rate` tokens per second per key, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str) -> float:
+        """Take a token for `key`; returns 0 if one was available, else the seconds until one is."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        # Least recently used keys go first; a forgotten bucket restarts full
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+class MongoTokenBucketLimiter:
+    """Token buckets shared by all workers, updated atomically in the rate_limits collection."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+
+    async def take(self, key: str) -> float:
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        refilled = {"$min": [self.burst, {"$add": [{"$ifNull": ["$tokens", self.burst]}, {"$multiply": [elapsed, self.rate]}]}]}
+        bucket = await db.rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    # A bucket is full again after burst / rate seconds; the TTL index removes it then
+                    "expires_at": {"$add": ["$$NOW", int(self.burst / self.rate * 1000) + 1000]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if bucket["allowed"] else (1 - bucket["tokens"]) / self.rate
+
+def make_limiter(rate: float, burst: float):
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoTokenBucketLimiter(rate, burst)
+    return TokenBucketLimiter(rate, burst)
+
+user_limiter = make_limiter(USER_RATE_LIMIT, USER_RATE_BURST)
+company_limiter = make_limiter(COMPANY_RATE_LIMIT, COMPANY_RATE_BURST)
+
+def too_many_requests(limit: str, retry_after: float) -> HTTPException:
+    requests_rejected.inc(limit)
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, please retry later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+async def enforce_rate_limits(user: User):
+    if not RATE_LIMIT_ENABLED:
+        return
+    wait = await user_limiter.take(f"user:{user.id}")
+    if wait:
+        raise too_many_requests("user", wait)
+    wait = await company_limiter.take(f"company:{user.company_id}")
+    if wait:
+        raise too_many_requests("company", wait)
+
+class ConcurrencyLimit:
+    """Caps how many requests of one kind run at once, overall or per key."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._active: Dict[str, int] = {}
+
+    def acquire(self, key: str = ""):
+        """Take a slot or raise a 429; every successful acquire needs a release()."""
+        if self._active.get(key, 0) >= self.limit:
+            raise too_many_requests(self.name, 1)
+        self._active[key] = self._active.get(key, 0) + 1
+
+    def release(self, key: str = ""):
+        self._active[key] -= 1
+        if not self._active[key]:
+            del self._active[key]
+
+login_slots = ConcurrencyLimit("login", LOGIN_MAX_CONCURRENT)
+export_slots = ConcurrencyLimit("export", EXPORT_MAX_CONCURRENT)
+company_export_slots = ConcurrencyLimit("company_export", EXPORT_MAX_CONCURRENT_PER_COMPANY)
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """StreamingResponse that runs `release` once the stream has ended or was aborted.
+
+    Cleanup in the body generator is not enough: if the client disconnects before
+    the first chunk, the generator is never started and its finally never runs.
+    """
+
+    def __init__(self, *args, release, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
 # Auth utilities
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_jobs_pending = 0
+
+async def run_password_job(operation: str, func, *args):
+    """Run a bcrypt call on the password pool so it never blocks the event loop."""
+    global password_jobs_pending
+    if password_jobs_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    password_jobs_pending += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        password_jobs_pending -= 1
+        password_hash_duration.observe(time.perf_counter() - start, operation)
+
+async def verify_password(plain_password, hashed_password):
+    """Return (valid, new_hash); new_hash is set when the stored hash uses another cost."""
+    return await run_password_job("verify", pwd_context.verify_and_update, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await run_password_job("hash", pwd_context.hash, password)
 
-def create_access_token(data: dict):
+def create_access_token(data: dict, expires: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.now(timezone.utc) + expires
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def authenticate_token(token: str, scope: Optional[str] = None) -> User:
+    """Resolve a JWT to its user; `scope` names the single-purpose token it must be."""
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication")
+        # Login tokens carry no scope, and scoped tokens are good for nothing else
+        if payload.get("scope") != scope:
+            raise HTTPException(status_code=401, detail="Invalid token")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user_doc:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+    user = user_cache.get(user_id) if USER_CACHE_ENABLED else None
+    if user is None:
+        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if not user_doc:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = User(**user_doc)
+        if USER_CACHE_ENABLED:
+            user_cache.set(user_id, user)
     
-    return User(**user_doc)
+    await enforce_rate_limits(user)
+    return user
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+async def get_stream_user(
+    ticket: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    # EventSource cannot send headers, so browsers pass a short-lived stream
+    # ticket as ?ticket=. Query strings end up in access logs; the login token must not.
+    if credentials is not None:
+        return await authenticate_token(credentials.credentials)
+    if ticket is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await authenticate_token(ticket, scope="notes_stream")
 
 # Auth endpoints
 @api_router.post("/auth/register", response_model=Token)
@@ -141,7 +2040,7 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=404, detail="Company not found")
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     user_obj = User(
         email=user_data.email,
         company_id=user_data.company_id,
@@ -150,9 +2049,9 @@ async def register(user_data: UserCreate):
     
     doc = user_obj.model_dump()
     doc['password_hash'] = hashed_password
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.users.insert_one(doc)
+    invalidate_cached_user(user_obj.id)
     
     # Create token
     access_token = create_access_token(data={"sub": user_obj.id})
@@ -161,15 +2060,24 @@ async def register(user_data: UserCreate):
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(credentials: UserLogin):
+    login_slots.acquire()
+    try:
+        return await _login(credentials)
+    finally:
+        login_slots.release()
+
+async def _login(credentials: UserLogin) -> Token:
     user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user_doc:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(credentials.password, user_doc['password_hash']):
+    valid, new_hash = await verify_password(credentials.password, user_doc['password_hash'])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+    if new_hash:
+        await db.users.update_one({"id": user_doc['id']}, {"$set": {"password_hash": new_hash}})
+        invalidate_cached_user(user_doc['id'])
     
     user_doc.pop('password_hash', None)
     user = User(**user_doc)
@@ -190,7 +2098,6 @@ async def create_company(company_data: CompanyCreate, current_user: User = Depen
     
     company_obj = Company(name=company_data.name)
     doc = company_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.companies.insert_one(doc)
     return company_obj
@@ -200,33 +2107,28 @@ async def get_companies(current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Only admins can view companies")
     
-    companies = await db.companies.find({}, {"_id": 0}).to_list(1000)
-    
-    for company in companies:
-        if isinstance(company['created_at'], str):
-            company['created_at'] = datetime.fromisoformat(company['created_at'])
+    companies = await db.companies.find({}, COMPANY_PROJECTION).to_list(1000)
     
-    return companies
+    return trusted_response(companies)
 
 @api_router.get("/companies/{company_id}", response_model=Company)
-async def get_company(company_id: str):
-    company = await db.companies.find_one({"id": company_id}, {"_id": 0})
+async def get_company(company_id: str, request: Request):
+    etag = await version_etag(company_version_key(company_id))
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    company = await db.companies.find_one({"id": company_id}, COMPANY_PROJECTION)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    if isinstance(company['created_at'], str):
-        company['created_at'] = datetime.fromisoformat(company['created_at'])
-    
-    return Company(**company)
+    return trusted_response(company, headers=etag_headers(etag))
 
 # Employee endpoints
 @api_router.post("/employees", response_model=Employee)
 async def create_employee(employee_data: EmployeeCreate, current_user: User = Depends(get_current_user)):
     # Check if employee with same number exists in company
-    existing = await db.employees.find_one({
-        "employee_number": employee_data.employee_number,
-        "company_id": current_user.company_id
-    })
+    existing = await get_company_employee(current_user.company_id, employee_number=employee_data.employee_number)
     if existing:
         raise HTTPException(status_code=400, detail="Employee number already exists")
     
@@ -237,59 +2139,201 @@ async def create_employee(employee_data: EmployeeCreate, current_user: User = De
     )
     
     doc = employee_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    await stamp_changes("employees", current_user.company_id, [doc])
     
-    await db.employees.insert_one(doc)
+    try:
+        await db.employees.insert_one(doc)
+    except DuplicateKeyError:
+        # Lost a race against a concurrent request for the same number
+        raise HTTPException(status_code=400, detail="Employee number already exists")
+    await bump_versions([company_version_key(current_user.company_id)])
+    if EMPLOYEE_CACHE_ENABLED:
+        employee_directory.put(employee_obj)
     return employee_obj
 
-@api_router.get("/employees", response_model=List[Employee])
-async def get_employees(current_user: User = Depends(get_current_user)):
-    employees = await db.employees.find(
-        {"company_id": current_user.company_id},
-        {"_id": 0}
-    ).to_list(1000)
+# Column headers accepted by the import, including those written by the CSV export
+IMPORT_COLUMNS = {
+    "employee_number": "employee_number",
+    "mitarbeiternummer": "employee_number",
+    "name": "name",
+}
+
+def _import_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store numeric barcodes as floats
+        value = int(value)
+    return str(value).strip()
+
+def _iter_import_rows(upload: UploadFile):
+    """Yield (row_number, values) for each data row of a CSV or XLSX upload."""
+    if (upload.filename or "").lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+        
+        try:
+            workbook = load_workbook(upload.file, read_only=True, data_only=True)
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f"Could not read file: {exc}")
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            dialect = csv.Sniffer().sniff(text.read(4096), delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        text.seek(0)
+        rows = csv.reader(text, dialect)
     
-    for emp in employees:
-        if isinstance(emp['created_at'], str):
-            emp['created_at'] = datetime.fromisoformat(emp['created_at'])
+    header = next(rows, None) or []
+    columns = [IMPORT_COLUMNS.get(_import_cell(cell).lower()) for cell in header]
+    if "employee_number" not in columns or "name" not in columns:
+        raise HTTPException(status_code=400, detail="File needs the columns employee_number and name")
     
-    return employees
+    for row_number, row in enumerate(rows, start=2):
+        values = {}
+        for column, cell in zip(columns, row):
+            if column:
+                values[column] = _import_cell(cell)
+        if any(values.values()):
+            yield row_number, values
+
+async def _import_employee_chunk(company_id: str, chunk: dict, summary: EmployeeImportSummary):
+    # Skip rows that would not change anything, then upsert the rest in one round trip
+    existing = {
+        emp["employee_number"]: emp["name"] async for emp in db.employees.find(
+            {"company_id": company_id, "employee_number": {"$in": list(chunk)}},
+            {"_id": 0, "employee_number": 1, "name": 1}
+        )
+    }
+    changed = []
+    for employee_number, employee_data in chunk.items():
+        if existing.get(employee_number) == employee_data.name:
+            summary.unchanged += 1
+            continue
+        changed.append({"employee_number": employee_number, "name": employee_data.name})
+    await stamp_changes("employees", company_id, changed)
+    
+    operations = []
+    for change in changed:
+        employee_number = change.pop("employee_number")
+        operations.append(UpdateOne(
+            {"company_id": company_id, "employee_number": employee_number},
+            {
+                "$set": change,
+                "$setOnInsert": {
+                    "id": str(uuid.uuid4()),
+                    "created_at": datetime.now(timezone.utc)
+                }
+            },
+            upsert=True
+        ))
+    if operations:
+        result = await db.employees.bulk_write(operations, ordered=False)
+        summary.inserted += result.upserted_count
+        summary.updated += result.modified_count
+        summary.unchanged += len(operations) - result.upserted_count - result.modified_count
+        await bump_versions([company_version_key(company_id)])
+
+def _read_import_chunk(rows, summary: EmployeeImportSummary) -> dict:
+    """Validate rows until a chunk is full or the file ends.
+
+    Parsing CSV and XLSX is CPU bound, so this runs in a worker thread.
+    """
+    chunk = {}
+    for row_number, values in rows:
+        try:
+            employee_data = EmployeeCreate(**values)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            detail = f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+        else:
+            if employee_data.employee_number and employee_data.name:
+                # Within a chunk the last row for a number wins
+                if employee_data.employee_number in chunk:
+                    summary.superseded += 1
+                chunk[employee_data.employee_number] = employee_data
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    break
+                continue
+            detail = "employee_number and name are required"
+        summary.rejected += 1
+        if len(summary.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            summary.errors.append(EmployeeImportError(row=row_number, detail=detail))
+    return chunk
+
+@api_router.post("/employees/import", response_model=EmployeeImportSummary)
+async def import_employees(file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
+    summary = EmployeeImportSummary()
+    rows = _iter_import_rows(file)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(_read_import_chunk, rows, summary)
+            if chunk:
+                await _import_employee_chunk(current_user.company_id, chunk, summary)
+            if len(chunk) < IMPORT_CHUNK_SIZE:
+                break
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not read file: {exc}")
+    finally:
+        # Names may have changed, drop this company's cached employees
+        employee_directory.invalidate_company(current_user.company_id)
+    
+    return summary
+
+@api_router.get("/employees", response_model=EmployeePage)
+async def get_employees(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    etag = await version_etag(company_version_key(current_user.company_id))
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    page = await fetch_page(
+        "employees",
+        {"company_id": current_user.company_id},
+        # Employee numbers are unique per company, so they alone order the pages
+        EMPLOYEE_PROJECTION, ["employee_number"], ASCENDING, limit, cursor
+    )
+    
+    return trusted_response(page, headers=etag_headers(etag))
+
+@api_router.get("/employees/changes", response_model=EmployeeChanges)
+async def get_employee_changes(
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    changes = await fetch_changes(
+        "employees", "employees", current_user.company_id, since, limit, EMPLOYEE_PROJECTION
+    )
+    return trusted_response(changes)
 
 @api_router.get("/employees/{employee_id}", response_model=Employee)
 async def get_employee(employee_id: str, current_user: User = Depends(get_current_user)):
-    employee = await db.employees.find_one(
-        {"id": employee_id, "company_id": current_user.company_id},
-        {"_id": 0}
-    )
+    employee = await get_company_employee(current_user.company_id, employee_id=employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    if isinstance(employee['created_at'], str):
-        employee['created_at'] = datetime.fromisoformat(employee['created_at'])
-    
-    return Employee(**employee)
+    return employee
 
 @api_router.get("/employees/number/{employee_number}", response_model=Employee)
 async def get_employee_by_number(employee_number: str, current_user: User = Depends(get_current_user)):
-    employee = await db.employees.find_one(
-        {"employee_number": employee_number, "company_id": current_user.company_id},
-        {"_id": 0}
-    )
+    employee = await get_company_employee(current_user.company_id, employee_number=employee_number)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    if isinstance(employee['created_at'], str):
-        employee['created_at'] = datetime.fromisoformat(employee['created_at'])
-    
-    return Employee(**employee)
+    return employee
 
 # Note endpoints
 @api_router.post("/notes", response_model=Note)
 async def create_note(note_data: NoteCreate, current_user: User = Depends(get_current_user)):
     # Verify employee exists and belongs to user's company
-    employee = await db.employees.find_one(
-        {"id": note_data.employee_id, "company_id": current_user.company_id}
-    )
+    employee = await get_company_employee(current_user.company_id, employee_id=note_data.employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -300,105 +2344,630 @@ async def create_note(note_data: NoteCreate, current_user: User = Depends(get_cu
     )
     
     doc = note_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['company_id'] = current_user.company_id
+    if NOTE_GROUP_COMMIT:
+        await note_group_commit.insert(doc)
+        return note_obj
     
+    await stamp_changes("notes", current_user.company_id, [doc])
     await db.notes.insert_one(doc)
+    await on_notes_created(current_user.company_id, [doc])
     return note_obj
 
-@api_router.get("/notes", response_model=List[Note])
-async def get_notes(current_user: User = Depends(get_current_user)):
-    # Get all employees from user's company
-    employees = await db.employees.find(
+@api_router.post("/notes/batch", response_model=NoteBatchResponse)
+async def create_notes_batch(batch: NoteBatchCreate, current_user: User = Depends(get_current_user)):
+    results = [NoteBatchResult(index=index, status='created') for index in range(len(batch.notes))]
+    
+    # Verify all employees with a single query
+    employee_ids = list({item.employee_id for item in batch.notes})
+    known_employees = {
+        emp["id"] async for emp in db.employees.find(
+            {"id": {"$in": employee_ids}, "company_id": current_user.company_id},
+            {"_id": 0, "id": 1}
+        )
+    }
+    
+    # Replays of earlier uploads are answered before any change number is taken:
+    # a number spent on an insert that fails holds back every delta sync of the
+    # company for CHANGE_SETTLE_SECONDS
+    keys = list({item.idempotency_key for item in batch.notes if item.idempotency_key is not None})
+    stored = {
+        note["idempotency_key"]: note["id"] async for note in db.notes.find(
+            {"company_id": current_user.company_id, "idempotency_key": {"$in": keys}},
+            {"_id": 0, "id": 1, "idempotency_key": 1}
+        )
+    } if keys else {}
+    
+    received_at = datetime.now(timezone.utc)
+    latest = received_at + timedelta(seconds=MAX_NOTE_CLOCK_SKEW_SECONDS)
+    docs = []
+    doc_indexes = []
+    batch_keys = {}
+    repeated = []
+    for index, item in enumerate(batch.notes):
+        result = results[index]
+        if item.employee_id not in known_employees:
+            result.status = 'rejected'
+            result.detail = "Employee not found"
+            continue
+        if item.idempotency_key is not None:
+            if item.idempotency_key in batch_keys:
+                repeated.append((index, batch_keys[item.idempotency_key]))
+                continue
+            batch_keys[item.idempotency_key] = index
+            if item.idempotency_key in stored:
+                result.status = 'duplicate'
+                result.id = stored[item.idempotency_key]
+                continue
+        
+        note_obj = Note(
+            employee_id=item.employee_id,
+            user_id=current_user.id,
+            note_text=item.note_text
+        )
+        if item.timestamp is not None:
+            # A scanner clock running ahead would pin its notes to the top of every page
+            if as_utc(item.timestamp) > latest:
+                note_obj.timestamp = received_at
+                result.detail = "Timestamp in the future, stored with the upload time"
+            else:
+                note_obj.timestamp = as_utc(item.timestamp)
+        result.id = note_obj.id
+        
+        doc = note_obj.model_dump()
+        doc['company_id'] = current_user.company_id
+        if item.idempotency_key is not None:
+            doc['idempotency_key'] = item.idempotency_key
+        docs.append(doc)
+        doc_indexes.append(index)
+    
+    duplicate_keys = {}
+    if docs:
+        await stamp_changes("notes", current_user.company_id, docs)
+        failed = set()
+        try:
+            await db.notes.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details["writeErrors"]:
+                failed.add(error["index"])
+                doc = docs[error["index"]]
+                result = results[doc_indexes[error["index"]]]
+                # Only a collision on the idempotency index is a replay
+                key_pattern = str(error.get("keyPattern", error.get("errmsg", "")))
+                if error["code"] == 11000 and "idempotency_key" in key_pattern:
+                    result.status = 'duplicate'
+                    duplicate_keys[doc['idempotency_key']] = result
+                else:
+                    result.status = 'rejected'
+                    result.detail = error.get("errmsg", "Write failed")
+                result.id = None
+        await on_notes_created(
+            current_user.company_id, [doc for position, doc in enumerate(docs) if position not in failed]
+        )
+    
+    # Report the ids of notes stored by a concurrent upload with the same key
+    if duplicate_keys:
+        async for note in db.notes.find(
+            {"company_id": current_user.company_id, "idempotency_key": {"$in": list(duplicate_keys)}},
+            {"_id": 0, "id": 1, "idempotency_key": 1}
+        ):
+            duplicate_keys[note["idempotency_key"]].id = note["id"]
+    
+    # Keys repeated within this batch share the outcome of their first occurrence
+    for index, first_index in repeated:
+        first = results[first_index]
+        results[index].status = 'rejected' if first.status == 'rejected' else 'duplicate'
+        results[index].id = first.id
+        results[index].detail = first.detail
+    
+    return NoteBatchResponse(
+        created=sum(1 for result in results if result.status == 'created'),
+        duplicates=sum(1 for result in results if result.status == 'duplicate'),
+        rejected=sum(1 for result in results if result.status == 'rejected'),
+        results=results
+    )
+
+@api_router.get("/notes", response_model=NotePage)
+async def get_notes(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    page = await fetch_page(
+        "notes",
         {"company_id": current_user.company_id},
-        {"id": 1}
-    ).to_list(1000)
+        NOTE_PROJECTION, ["timestamp", "id"], DESCENDING, limit, cursor
+    )
     
-    employee_ids = [emp["id"] for emp in employees]
+    return trusted_response(page)
+
+@api_router.get("/notes/changes", response_model=NoteChanges)
+async def get_note_changes(
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    changes = await fetch_changes(
+        "notes", "notes", current_user.company_id, since, limit, NOTE_PROJECTION
+    )
+    return trusted_response(changes)
+
+@api_router.get("/notes/search", response_model=NoteSearchPage)
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search over the company's notes, best matches first.
+
+    `q` uses MongoDB text search syntax: words, "phrases" and -exclusions,
+    stemmed as German. Pages continue after the (score, id) of the cursor.
+    """
+    pipeline = [
+        {"$match": {"company_id": current_user.company_id, "$text": {"$search": q}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if cursor:
+        score, last_id = decode_cursor(cursor, ["score", "id"])
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "id": {"$lt": last_id}},
+        ]}})
+    pipeline += [
+        {"$sort": {"score": DESCENDING, "id": DESCENDING}},
+        {"$limit": limit + 1},
+        # Only the page is joined with its employees
+        EMPLOYEE_LOOKUP,
+        {"$project": {**JOINED_NOTE_PROJECTION, "score": 1}},
+    ]
+    docs = await db.notes.aggregate(pipeline).to_list(limit + 1)
     
-    notes = await db.notes.find(
-        {"employee_id": {"$in": employee_ids}},
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(1000)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1]["score"], docs[-1]["id"]])
     
-    for note in notes:
-        if isinstance(note['timestamp'], str):
-            note['timestamp'] = datetime.fromisoformat(note['timestamp'])
-        if isinstance(note['created_at'], str):
-            note['created_at'] = datetime.fromisoformat(note['created_at'])
+    return trusted_response({"items": docs, "next_cursor": next_cursor})
+
+@api_router.post("/notes/stream/ticket", response_model=StreamTicket)
+async def create_stream_ticket(current_user: User = Depends(get_current_user)):
+    """Ticket for opening /notes/stream, valid for LIVE_FEED_TICKET_SECONDS."""
+    ticket = create_access_token(
+        {"sub": current_user.id, "scope": "notes_stream"}, timedelta(seconds=LIVE_FEED_TICKET_SECONDS)
+    )
+    return StreamTicket(ticket=ticket, expires_in=LIVE_FEED_TICKET_SECONDS)
+
+@api_router.get("/notes/stream")
+async def stream_notes(current_user: User = Depends(get_stream_user)):
+    """Server-Sent Events of the notes created in the caller's company."""
+    subscription = note_broker.subscribe(current_user.company_id)
     
-    return notes
+    async def events():
+        yield b"retry: 3000\n\n"
+        closing = asyncio.ensure_future(live_feed_closing.wait())
+        try:
+            while not subscription.dropped and not closing.done():
+                event = asyncio.ensure_future(subscription.queue.get())
+                await asyncio.wait({event, closing}, timeout=LIVE_FEED_HEARTBEAT_SECONDS,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if event.done():
+                    yield event.result()
+                else:
+                    event.cancel()
+                    if not closing.done():
+                        yield b": keepalive\n\n"
+        finally:
+            # On shutdown the stream ends and the client reconnects to another worker or after the restart
+            closing.cancel()
+    
+    # Released by the response, also when the client is gone before the stream starts
+    return ReleasingStreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        release=lambda: note_broker.unsubscribe(subscription)
+    )
 
-@api_router.get("/notes/employee/{employee_id}", response_model=List[Note])
-async def get_employee_notes(employee_id: str, current_user: User = Depends(get_current_user)):
+@api_router.get("/notes/employee/{employee_id}", response_model=NotePage)
+async def get_employee_notes(
+    employee_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_archive: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    # The version is scoped to the user's company, so a match implies the employee belongs to it
+    etag = await version_etag(notes_version_key(current_user.company_id, employee_id))
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
     # Verify employee belongs to user's company
-    employee = await db.employees.find_one(
-        {"id": employee_id, "company_id": current_user.company_id}
-    )
+    employee = await get_company_employee(current_user.company_id, employee_id=employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    notes = await db.notes.find(
-        {"employee_id": employee_id},
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(1000)
+    page = await fetch_tiered_page({"employee_id": employee_id}, limit, cursor, include_archive)
     
+    return trusted_response(page, headers=etag_headers(etag))
+
+# Export formats: media type and file extension
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+async def _iter_tiers(query: dict, include_archive: bool):
+    """Yield the matching notes, newest first, merging the archive in when asked to."""
+    sort = [("timestamp", DESCENDING), ("id", DESCENDING)]
+    collections = ["notes", "notes_archive"] if include_archive else ["notes"]
+    cursors = [db[name].find(query, NOTE_PROJECTION).sort(sort).batch_size(EXPORT_BATCH_SIZE) for name in collections]
+    heads = [await anext(cursor, None) for cursor in cursors]
+    last_id = None
+    while any(head is not None for head in heads):
+        index = max(
+            (i for i, head in enumerate(heads) if head is not None),
+            key=lambda i: (heads[i]["timestamp"], heads[i]["id"])
+        )
+        note = heads[index]
+        heads[index] = await anext(cursors[index], None)
+        # A note caught mid-archiving is in both tiers; the copies come out adjacent
+        if note["id"] != last_id:
+            last_id = note["id"]
+            yield note
+
+async def _iter_export_batches(company_id: str, query: dict, include_archive: bool):
+    """Yield the matching notes in batches of EXPORT_BATCH_SIZE, joined with their employees."""
+    batch = []
+    async for note in _iter_tiers(query, include_archive):
+        batch.append(note)
+        if len(batch) == EXPORT_BATCH_SIZE:
+            yield await _join_employees(company_id, batch)
+            batch = []
+    if batch:
+        yield await _join_employees(company_id, batch)
+
+async def _join_employees(company_id: str, notes: list) -> list:
+    # Only the employees referenced by this batch are looked up, never the whole company
+    employees = {
+        emp["id"]: emp async for emp in db.employees.find(
+            {"id": {"$in": list({note["employee_id"] for note in notes})}, "company_id": company_id},
+            {"_id": 0, "id": 1, "employee_number": 1, "name": 1}
+        )
+    }
     for note in notes:
-        if isinstance(note['timestamp'], str):
-            note['timestamp'] = datetime.fromisoformat(note['timestamp'])
-        if isinstance(note['created_at'], str):
-            note['created_at'] = datetime.fromisoformat(note['created_at'])
-    
+        employee = employees.get(note["employee_id"], {})
+        note["employee_number"] = employee.get("employee_number", "")
+        note["employee_name"] = employee.get("name", "")
     return notes
 
+async def _encode_csv(batches):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    # Same columns as accepted by POST /employees/import
+    writer.writerow(['Mitarbeiternummer', 'Name', 'Notiz', 'Timestamp', 'Erstellt am'])
+    async for notes in batches:
+        for note in notes:
+            writer.writerow([
+                note['employee_number'],
+                note['employee_name'],
+                note['note_text'],
+                note['timestamp'].isoformat(),
+                note['created_at'].isoformat()
+            ])
+        yield output.getvalue().encode('utf-8')
+        output.seek(0)
+        output.truncate()
+    yield output.getvalue().encode('utf-8')
+
+async def _encode_ndjson(batches):
+    async for notes in batches:
+        yield b"".join(orjson.dumps(note, option=ORJSON_OPTIONS) + b"\n" for note in notes)
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only file that hands out what was written so far, keeping tell() absolute."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def _encode_parquet(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    timestamp = pa.timestamp("ms", tz="UTC")
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("employee_id", pa.string()),
+        ("employee_number", pa.string()),
+        ("employee_name", pa.string()),
+        ("user_id", pa.string()),
+        ("note_text", pa.string()),
+        ("timestamp", timestamp),
+        ("created_at", timestamp),
+    ])
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    
+    def write(rows):
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+    
+    # Row groups span several batches; columnar encoding runs off the event loop
+    rows = []
+    async for notes in batches:
+        rows.extend(notes)
+        if len(rows) >= PARQUET_ROW_GROUP_SIZE:
+            await asyncio.to_thread(write, rows)
+            rows = []
+            yield sink.drain()
+    if rows:
+        await asyncio.to_thread(write, rows)
+    writer.close()
+    yield sink.drain()
+
+EXPORT_ENCODERS = {"csv": _encode_csv, "ndjson": _encode_ndjson, "parquet": _encode_parquet}
+
+async def _iter_export(company_id: str, query: dict, include_archive: bool, export_format: str, compress: bool):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    label = f"{export_format}.gz" if compress else export_format
+    start = time.perf_counter()
+    rows = 0
+    
+    async def batches():
+        nonlocal rows
+        async for notes in _iter_export_batches(company_id, query, include_archive):
+            rows += len(notes)
+            yield notes
+    
+    try:
+        async for chunk in EXPORT_ENCODERS[export_format](batches()):
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        export_duration.observe(time.perf_counter() - start, label)
+        export_rows.inc(label, amount=rows)
+
+@api_router.get("/notes/export")
+async def export_notes(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    employee_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    compress: bool = False,
+    include_archive: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the company's notes as CSV, NDJSON or Parquet, newest first.
+
+    All filters are part of the Mongo query. `compress` gzips CSV and NDJSON
+    (Content-Encoding); Parquet is always compressed per column with zstd.
+    `include_archive` merges in the notes moved to notes_archive.
+    """
+    query = {"company_id": current_user.company_id}
+    if employee_id:
+        query["employee_id"] = employee_id
+    if user_id:
+        query["user_id"] = user_id
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = as_utc(start)
+        if end:
+            query["timestamp"]["$lt"] = as_utc(end)
+    
+    compress = compress and export_format != "parquet"
+    media_type, extension = EXPORT_FORMATS[export_format]
+    headers = {
+        "Content-Disposition": f"attachment; filename=notizen_export_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{extension}"
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    
+    company_export_slots.acquire(current_user.company_id)
+    try:
+        export_slots.acquire()
+    except HTTPException:
+        company_export_slots.release(current_user.company_id)
+        raise
+    
+    def release():
+        export_slots.release()
+        company_export_slots.release(current_user.company_id)
+    
+    return ReleasingStreamingResponse(
+        _iter_export(current_user.company_id, query, include_archive, export_format, compress),
+        media_type=media_type,
+        headers=headers,
+        release=release
+    )
+
 @api_router.get("/notes/export/csv")
-async def export_notes_csv(current_user: User = Depends(get_current_user)):
-    # Get all employees from user's company
-    employees = await db.employees.find(
-        {"company_id": current_user.company_id},
-        {"_id": 0}
-    ).to_list(1000)
+async def export_notes_csv(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    employee_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    compress: bool = False,
+    include_archive: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    return await export_notes("csv", start, end, employee_id, user_id, compress, include_archive, current_user)
+
+# Report endpoints
+def fill_days(per_day: dict, start: date, end: date) -> List[dict]:
+    """Counts for every day from start to end, including days without notes."""
+    days = []
+    day = start
+    while day <= end:
+        days.append({"day": day.isoformat(), "count": per_day.get(day.isoformat(), 0)})
+        day += timedelta(days=1)
+    return days
+
+@api_router.get("/reports/notes", response_model=NoteReport)
+async def get_note_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Notes per day, employee and user, read from the day rollups."""
+    end = end or datetime.now(REPORT_TIMEZONE).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Reports cover at most {MAX_REPORT_DAYS} days")
     
-    employee_map = {emp["id"]: emp for emp in employees}
-    employee_ids = list(employee_map.keys())
+    per_day = {}
+    per_employee = {}
+    per_user = {}
+    async for rollup in db.note_rollups.find(
+        {"company_id": current_user.company_id, "day": {"$gte": start.isoformat(), "$lte": end.isoformat()}}
+    ):
+        per_day[rollup["day"]] = rollup.get("count", 0)
+        for employee_id, count in rollup.get("employees", {}).items():
+            per_employee[employee_id] = per_employee.get(employee_id, 0) + count
+        for user_id, count in rollup.get("users", {}).items():
+            per_user[user_id] = per_user.get(user_id, 0) + count
     
-    # Get all notes
-    notes = await db.notes.find(
-        {"employee_id": {"$in": employee_ids}},
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(10000)
+    employees = {
+        emp["id"]: emp async for emp in db.employees.find(
+            {"company_id": current_user.company_id, "id": {"$in": list(per_employee)}},
+            {"_id": 0, "id": 1, "name": 1, "employee_number": 1}
+        )
+    }
+    users = {
+        user["id"]: user async for user in db.users.find(
+            {"company_id": current_user.company_id, "id": {"$in": list(per_user)}},
+            {"_id": 0, "id": 1, "email": 1}
+        )
+    }
     
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
+    return trusted_response({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total": sum(per_day.values()),
+        "days": fill_days(per_day, start, end),
+        "employees": [
+            {
+                "employee_id": employee_id,
+                "employee_name": employees.get(employee_id, {}).get("name"),
+                "employee_number": employees.get(employee_id, {}).get("employee_number"),
+                "count": count,
+            }
+            for employee_id, count in sorted(per_employee.items(), key=lambda item: item[1], reverse=True)
+        ],
+        "users": [
+            {"user_id": user_id, "email": users.get(user_id, {}).get("email"), "count": count}
+            for user_id, count in sorted(per_user.items(), key=lambda item: item[1], reverse=True)
+        ],
+    })
+
+# Dashboard endpoints
+@api_router.get("/dashboard/summary", response_model=DashboardSummary)
+async def get_dashboard_summary(
+    notes: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    days: int = Query(14, ge=1, le=MAX_REPORT_DAYS),
+    current_user: User = Depends(get_current_user)
+):
+    """Everything the dashboard needs for its first paint, in one request."""
+    company_id = current_user.company_id
+    end = datetime.now(REPORT_TIMEZONE).date()
+    start = end - timedelta(days=days - 1)
     
-    # Header
-    writer.writerow(['Mitarbeiternummer', 'Name', 'Notiz', 'Timestamp', 'Erstellt am'])
+    async def recent_notes():
+        # The watermark is read first, so changes fetched with it cover every note written meanwhile
+        token = await current_change_seq("notes", company_id)
+        docs = await db.notes.aggregate([
+            {"$match": {"company_id": company_id}},
+            {"$sort": {"timestamp": DESCENDING, "id": DESCENDING}},
+            {"$limit": notes + 1},
+            EMPLOYEE_LOOKUP,
+            {"$project": JOINED_NOTE_PROJECTION},
+        ]).to_list(notes + 1)
+        next_cursor = None
+        if len(docs) > notes:
+            docs = docs[:notes]
+            next_cursor = encode_cursor([docs[-1]["timestamp"], docs[-1]["id"]])
+        return token, docs, next_cursor
     
-    # Data
-    for note in notes:
-        employee = employee_map.get(note['employee_id'], {})
-        timestamp = note['timestamp'] if isinstance(note['timestamp'], str) else note['timestamp'].isoformat()
-        created_at = note['created_at'] if isinstance(note['created_at'], str) else note['created_at'].isoformat()
-        
-        writer.writerow([
-            employee.get('employee_number', ''),
-            employee.get('name', ''),
-            note['note_text'],
-            timestamp,
-            created_at
-        ])
-    
-    output.seek(0)
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=notizen_export_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv"
+    async def per_day():
+        return {
+            rollup["day"]: rollup.get("count", 0) async for rollup in db.note_rollups.find(
+                {"company_id": company_id, "day": {"$gte": start.isoformat(), "$lte": end.isoformat()}},
+                {"_id": 0, "day": 1, "count": 1}
+            )
         }
+    
+    employee_count, (token, docs, next_cursor), counts = await asyncio.gather(
+        db.employees.count_documents({"company_id": company_id}),
+        recent_notes(),
+        per_day()
+    )
+    
+    return trusted_response({
+        "user": current_user.model_dump(),
+        "employee_count": employee_count,
+        "recent_notes": docs,
+        "notes_next_cursor": next_cursor,
+        "notes_token": str(token),
+        "days": fill_days(counts, start, end),
+    })
+
+# Health endpoints
+@api_router.get("/health/ready")
+async def get_readiness():
+    """503 until this worker has warmed up, during shutdown and while MongoDB is unreachable."""
+    ready = worker_ready
+    if ready:
+        try:
+            await asyncio.wait_for(db.command("ping"), MONGO_SERVER_SELECTION_TIMEOUT_MS / 1000)
+        except (PyMongoError, asyncio.TimeoutError):
+            ready = False
+    pool = {
+        "open": int(mongo_pool_connections.get("open")),
+        "checked_out": int(mongo_pool_connections.get("checked_out")),
+        "min_size": MONGO_MIN_POOL_SIZE,
+        "max_size": MONGO_MAX_POOL_SIZE,
+    }
+    return UTCJSONResponse(
+        {"status": "ready" if ready else "unavailable", "pool": pool},
+        status_code=200 if ready else 503
     )
 
+# Metrics endpoint
+@api_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router)
 
 app.add_middleware(
@@ -409,12 +2978,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -151,7 +151,7 @@ class StaffNotesAPITester:
             token=self.user_token
         )
         if success:
-            print(f"   Found {len(response)} employees")
+            print(f"   Found {len(response.get('items', []))} employees")
             return True
         return False
 
@@ -184,7 +184,7 @@ class StaffNotesAPITester:
             token=self.user_token
         )
         if success:
-            print(f"   Found {len(response)} notes")
+            print(f"   Found {len(response.get('items', []))} notes")
             return True
         return False
 
@@ -268,7 +268,7 @@ async def create_admin():
     company_doc = {
         'id': company_id,
         'name': 'Haupt-Firma',
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'created_at': datetime.now(timezone.utc)
     }
     await db.companies.insert_one(company_doc)
     
@@ -280,7 +280,7 @@ async def create_admin():
         'password_hash': pwd_context.hash('admin2024'),
         'company_id': company_id,
         'role': 'admin',
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'created_at': datetime.now(timezone.utc)
     }
     await db.users.insert_one(admin_doc)
     print(f'✅ Admin erstellt: admin@admin.de / admin2024')
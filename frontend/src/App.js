@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import "@/App.css";
 import { BrowserRouter, Routes, Route, Navigate } from "react-router-dom";
 import axios from "axios";
@@ -26,19 +26,29 @@ api.interceptors.request.use((config) => {
 function App() {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
+  // The dashboard summary restores the session and already holds the dashboard's first page
+  const initialSummary = useRef(null);
 
   useEffect(() => {
     const token = localStorage.getItem('token');
     if (token) {
-      api.get('/auth/me')
+      // Only a rejected token ends the session. After a 429 or a transient
+      // error the lighter /auth/me is tried, and the dashboard loads its summary itself.
+      const isAuthError = (error) => [401, 403].includes(error.response?.status);
+      api.get('/dashboard/summary')
         .then(res => {
-          setUser(res.data);
-          setLoading(false);
+          initialSummary.current = res.data;
+          return res.data.user;
         })
-        .catch(() => {
-          localStorage.removeItem('token');
-          setLoading(false);
-        });
+        .catch(error => {
+          if (isAuthError(error)) throw error;
+          return api.get('/auth/me').then(res => res.data);
+        })
+        .then(setUser)
+        .catch(error => {
+          if (isAuthError(error)) localStorage.removeItem('token');
+        })
+        .finally(() => setLoading(false));
     } else {
       setLoading(false);
     }
@@ -46,9 +56,17 @@ function App() {
 
   const logout = () => {
     localStorage.removeItem('token');
+    initialSummary.current = null;
     setUser(null);
   };
 
+  // Handed out once, a remounted dashboard loads a fresh summary
+  const takeSummary = () => {
+    const summary = initialSummary.current;
+    initialSummary.current = null;
+    return summary;
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center bg-gradient-to-br from-slate-50 to-blue-50">
@@ -81,7 +99,7 @@ function App() {
           } />
           <Route path="/dashboard" element={
             user ? 
-              <UserDashboard user={user} logout={logout} /> : 
+              <UserDashboard user={user} logout={logout} takeSummary={takeSummary} /> : 
               <Navigate to="/login" />
           } />
         </Routes>
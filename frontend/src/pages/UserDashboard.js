@@ -11,9 +11,12 @@ import { api } from '../App';
 import { ScanBarcode, Plus, LogOut, FileDown, User as UserIcon, StickyNote } from 'lucide-react';
 import { Html5QrcodeScanner } from 'html5-qrcode';
 
-export default function UserDashboard({ user, logout }) {
+export default function UserDashboard({ user, logout, takeSummary }) {
   const [employees, setEmployees] = useState([]);
   const [notes, setNotes] = useState([]);
+  const [notesCursor, setNotesCursor] = useState(null);
+  const [notesToken, setNotesToken] = useState(null);
+  const [employeesToken, setEmployeesToken] = useState(null);
   const [selectedEmployee, setSelectedEmployee] = useState(null);
   const [newEmployeeName, setNewEmployeeName] = useState('');
   const [scannedBarcode, setScannedBarcode] = useState('');
@@ -24,8 +27,46 @@ export default function UserDashboard({ user, logout }) {
   const [activeTab, setActiveTab] = useState('scan');
 
   useEffect(() => {
-    fetchEmployees();
-    fetchNotes();
+    // Notes arrive with their employee's name and number, so the employee list
+    // for the Mitarbeiter tab can wait until after first paint
+    fetchSummary().then(fetchEmployees);
+  }, []);
+
+  useEffect(() => {
+    // Notes created by colleagues are pushed as they are saved. EventSource
+    // cannot send headers, so the stream is opened with a short-lived ticket.
+    let source = null;
+    let retry = null;
+    let closed = false;
+    const reconnect = () => {
+      if (!closed) retry = setTimeout(connect, 3000);
+    };
+    const connect = async () => {
+      let ticket;
+      try {
+        ticket = (await api.post('/notes/stream/ticket')).data.ticket;
+      } catch (error) {
+        reconnect();
+        return;
+      }
+      if (closed) return;
+      source = new EventSource(`${api.defaults.baseURL}/notes/stream?ticket=${encodeURIComponent(ticket)}`);
+      source.addEventListener('note', (event) => {
+        const note = JSON.parse(event.data);
+        setNotes((current) => current.some((n) => n.id === note.id) ? current : [note, ...current]);
+      });
+      source.onerror = () => {
+        // The browser retries dropped connections itself, but gives up once
+        // the server refuses one, e.g. after the ticket expired
+        if (source.readyState === EventSource.CLOSED) reconnect();
+      };
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
   }, []);
 
   useEffect(() => {
@@ -81,19 +122,87 @@ export default function UserDashboard({ user, logout }) {
     }
   };
 
+  // Fetch every change after `token`; returns the changed items and the new token
+  const fetchChanges = async (path, token) => {
+    let items = [];
+    let since = token;
+    let hasMore = true;
+    while (hasMore) {
+      const response = await api.get(path, { params: { since } });
+      items = items.concat(response.data.items);
+      since = response.data.next_token;
+      hasMore = response.data.has_more;
+    }
+    return { items, token: since };
+  };
+
   const fetchEmployees = async () => {
     try {
-      const response = await api.get('/employees');
-      setEmployees(response.data);
+      // Take the change watermark first so nothing written during the load is missed
+      const tokenResponse = await api.get('/employees/changes');
+      setEmployeesToken(tokenResponse.data.next_token);
+      // Employees are needed to resolve note authors, so load every page
+      let all = [];
+      let cursor = null;
+      do {
+        const response = await api.get('/employees', {
+          params: { limit: 1000, cursor }
+        });
+        all = all.concat(response.data.items);
+        cursor = response.data.next_cursor;
+      } while (cursor);
+      setEmployees(all);
+    } catch (error) {
+      toast.error('Fehler beim Laden der Mitarbeiter');
+    }
+  };
+
+  const refreshEmployees = async () => {
+    try {
+      const { items, token } = await fetchChanges('/employees/changes', employeesToken);
+      setEmployees((current) => {
+        const changed = new Map(items.map((emp) => [emp.id, emp]));
+        const merged = current.map((emp) => changed.get(emp.id) || emp);
+        const known = new Set(current.map((emp) => emp.id));
+        return merged.concat(items.filter((emp) => !known.has(emp.id)));
+      });
+      setEmployeesToken(token);
     } catch (error) {
       toast.error('Fehler beim Laden der Mitarbeiter');
     }
   };
 
-  const fetchNotes = async () => {
+  const fetchSummary = async () => {
     try {
-      const response = await api.get('/notes');
-      setNotes(response.data);
+      // First paint in one request, usually already made by App when restoring the session
+      const summary = (takeSummary && takeSummary()) || (await api.get('/dashboard/summary')).data;
+      setNotesToken(summary.notes_token);
+      setNotes(summary.recent_notes);
+      setNotesCursor(summary.notes_next_cursor);
+    } catch (error) {
+      toast.error('Fehler beim Laden der Notizen');
+    }
+  };
+
+  const fetchNotes = async (cursor) => {
+    try {
+      const response = await api.get('/notes', { params: { cursor } });
+      setNotes([...notes, ...response.data.items]);
+      setNotesCursor(response.data.next_cursor);
+    } catch (error) {
+      toast.error('Fehler beim Laden der Notizen');
+    }
+  };
+
+  const refreshNotes = async () => {
+    try {
+      const { items, token } = await fetchChanges('/notes/changes', notesToken);
+      // Changes arrive oldest first, the list shows the newest first
+      setNotes((current) => {
+        const known = new Set(current.map((note) => note.id));
+        return [...items.filter((note) => !known.has(note.id)).reverse(), ...current];
+      });
+      setNotesToken(token);
     } catch (error) {
       toast.error('Fehler beim Laden der Notizen');
     }
@@ -115,7 +224,7 @@ export default function UserDashboard({ user, logout }) {
       setSelectedEmployee(response.data);
       setNewEmployeeName('');
       setIsNoteDialogOpen(true);
-      fetchEmployees();
+      refreshEmployees();
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Fehler beim Erstellen des Mitarbeiters');
     }
@@ -129,16 +238,24 @@ export default function UserDashboard({ user, logout }) {
     }
 
     try {
-      await api.post('/notes', {
+      const response = await api.post('/notes', {
         employee_id: selectedEmployee.id,
         note_text: noteText
       });
+      // Show the new note right away; the delta sync may hold it back while
+      // another write of the company is still in flight
+      const note = {
+        ...response.data,
+        employee_name: selectedEmployee.name,
+        employee_number: selectedEmployee.employee_number
+      };
+      setNotes((current) => current.some((n) => n.id === note.id) ? current : [note, ...current]);
       toast.success('Notiz erfolgreich gespeichert!');
       setNoteText('');
       setIsNoteDialogOpen(false);
       setScannedBarcode('');
       setSelectedEmployee(null);
-      fetchNotes();
+      refreshNotes();
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Fehler beim Speichern der Notiz');
     }
@@ -308,7 +425,9 @@ export default function UserDashboard({ user, logout }) {
             </div>
             <div className="space-y-4">
               {notes.map((note) => {
-                const employee = getEmployeeById(note.employee_id);
+                const employee = getEmployeeById(note.employee_id) || (note.employee_name
+                  ? { name: note.employee_name, employee_number: note.employee_number }
+                  : null);
                 return (
                   <Card key={note.id} className="shadow-md" data-testid={`note-card-${note.id}`}>
                     <CardHeader>
@@ -333,6 +452,17 @@ export default function UserDashboard({ user, logout }) {
                 );
               })}
             </div>
+            {notesCursor && (
+              <div className="mt-4 text-center">
+                <Button
+                  onClick={() => fetchNotes(notesCursor)}
+                  variant="outline"
+                  data-testid="load-more-notes-button"
+                >
+                  Weitere Notizen laden
+                </Button>
+              </div>
+            )}
             {notes.length === 0 && (
               <Card className="shadow-md">
                 <CardContent className="py-12 text-center">
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "staff_scanner_test")
+# mongomock has no explain()
+os.environ.setdefault("INDEX_VERIFICATION", "off")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import server as server_module  # noqa: E402
+
+COMPANY_ID = "company-1"
+USER_ID = "user-1"
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def make_note(index: int, employee_id: str = "employee-0", **fields) -> dict:
+    timestamp = BASE_TIME + timedelta(hours=index)
+    return {
+        "id": f"note-{index:03}",
+        "employee_id": employee_id,
+        "user_id": USER_ID,
+        "company_id": COMPANY_ID,
+        "note_text": f"Notiz {index}",
+        "timestamp": timestamp,
+        "created_at": timestamp,
+        **fields,
+    }
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def server():
+    """The server module on an empty in-memory database with cold caches."""
+    server_module.client = AsyncMongoMockClient(tz_aware=True)
+    server_module.db = server_module.client[os.environ["DB_NAME"]]
+    server_module.user_cache.clear()
+    server_module.employee_directory.clear()
+    yield server_module
+    server_module.client = None
+    server_module.db = None
+
+
+@pytest.fixture
+def api(server):
+    """TestClient authenticated as a user of COMPANY_ID, with two employees."""
+    async def seed():
+        now = datetime.now(timezone.utc)
+        await server.db.companies.insert_one({"id": COMPANY_ID, "name": "Firma", "created_at": now})
+        await server.db.users.insert_one({
+            "id": USER_ID, "email": "user@firma.de", "company_id": COMPANY_ID, "role": "user",
+            "password_hash": "-", "created_at": now,
+        })
+        for index in range(2):
+            await server.db.employees.insert_one({
+                "id": f"employee-{index}", "employee_number": f"{index:04}", "name": f"Mitarbeiter {index}",
+                "company_id": COMPANY_ID, "created_at": now,
+            })
+
+    run(seed())
+    test_client = TestClient(server.app)
+    test_client.headers["Authorization"] = f"Bearer {server.create_access_token({'sub': USER_ID})}"
+    return test_client
@@ -0,0 +1,112 @@
+import pytest
+from fastapi import HTTPException
+
+from .conftest import COMPANY_ID, USER_ID
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(server, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server.time, "monotonic", clock)
+    return clock
+
+
+@pytest.mark.anyio
+async def test_bucket_allows_burst_then_reports_wait(server, clock):
+    limiter = server.TokenBucketLimiter(rate=2, burst=3)
+
+    assert [await limiter.take("k") for _ in range(3)] == [0, 0, 0]
+    # Empty bucket: one token takes 1 / rate seconds
+    assert await limiter.take("k") == pytest.approx(0.5)
+    clock.now += 0.25
+    assert await limiter.take("k") == pytest.approx(0.25)
+    clock.now += 0.25
+    assert await limiter.take("k") == 0
+
+
+@pytest.mark.anyio
+async def test_bucket_refill_is_capped_at_burst(server, clock):
+    limiter = server.TokenBucketLimiter(rate=10, burst=2)
+    for _ in range(2):
+        await limiter.take("k")
+
+    clock.now += 3600
+    assert [await limiter.take("k") for _ in range(2)] == [0, 0]
+    assert await limiter.take("k") > 0
+
+
+@pytest.mark.anyio
+async def test_buckets_are_bounded_least_recently_used_first(server, clock):
+    limiter = server.TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+    await limiter.take("a")
+    await limiter.take("b")
+    assert await limiter.take("a") > 0  # a is now the most recently used
+    await limiter.take("c")
+
+    assert list(limiter._buckets) == ["a", "c"]
+    # A forgotten bucket restarts full
+    assert await limiter.take("b") == 0
+
+
+def test_retry_after_is_rounded_up_to_whole_seconds(server):
+    assert server.too_many_requests("user", 0.2).headers["Retry-After"] == "1"
+    assert server.too_many_requests("user", 2.01).headers["Retry-After"] == "3"
+
+
+def test_rate_limited_requests_get_429(api, server, clock, monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(server, "user_limiter", server.TokenBucketLimiter(rate=1, burst=2))
+    monkeypatch.setattr(server, "company_limiter", server.TokenBucketLimiter(rate=100, burst=100))
+
+    statuses = [api.get("/api/auth/me").status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    clock.now += 1
+    assert api.get("/api/auth/me").status_code == 200
+
+
+def test_concurrency_limit_is_per_key_and_released(server):
+    slots = server.ConcurrencyLimit("export", 1)
+    slots.acquire("a")
+    slots.acquire("b")
+
+    with pytest.raises(HTTPException) as error:
+        slots.acquire("a")
+    assert error.value.status_code == 429
+
+    slots.release("a")
+    slots.acquire("a")
+    slots.release("a")
+    slots.release("b")
+    assert slots._active == {}
+
+
+@pytest.mark.anyio
+async def test_export_slots_are_released_when_client_leaves_early(server, monkeypatch):
+    monkeypatch.setattr(server, "export_slots", server.ConcurrencyLimit("export", 1))
+    monkeypatch.setattr(server, "company_export_slots", server.ConcurrencyLimit("company_export", 1))
+    user = server.User(id=USER_ID, email="user@firma.de", company_id=COMPANY_ID, role="user")
+    response = await server.export_notes(
+        export_format="csv", start=None, end=None, employee_id=None, user_id=None,
+        compress=False, include_archive=False, current_user=user
+    )
+    assert server.company_export_slots._active == {COMPANY_ID: 1}
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("connection closed")
+
+    with pytest.raises(Exception):
+        await response({"type": "http", "method": "GET", "path": "/api/notes/export"}, receive, send)
+    assert server.export_slots._active == {}
+    assert server.company_export_slots._active == {}
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from .conftest import COMPANY_ID, make_note
+
+pytestmark = pytest.mark.anyio
+
+QUERY = {"employee_id": "employee-0"}
+
+
+async def seed_tiers(server):
+    """Ten notes: even ones archived, odd ones current, note 4 in both tiers."""
+    notes = [make_note(index) for index in range(10)]
+    current = [note for note in notes if note["id"] != "note-004" and int(note["id"][-1]) % 2]
+    archived = [note for note in notes if not int(note["id"][-1]) % 2]
+    await server.db.notes.insert_many([dict(note) for note in current + [notes[4]]])
+    await server.db.notes_archive.insert_many([dict(note) for note in archived])
+    return [note["id"] for note in reversed(notes)]
+
+
+async def collect_pages(server, limit: int, include_archive: bool = True) -> list:
+    ids, cursor = [], None
+    while True:
+        page = await server.fetch_tiered_page(QUERY, limit, cursor, include_archive)
+        assert len(page["items"]) <= limit
+        ids += [note["id"] for note in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 9, 10, 11])
+async def test_merged_pages_hold_every_note_once_in_order(server, limit):
+    expected = await seed_tiers(server)
+
+    assert await collect_pages(server, limit) == expected
+
+
+async def test_pages_without_archive_only_read_current_notes(server):
+    await seed_tiers(server)
+
+    assert await collect_pages(server, 2, include_archive=False) == ["note-009", "note-007", "note-005", "note-004", "note-003", "note-001"]
+
+
+async def test_last_page_has_no_cursor(server):
+    await seed_tiers(server)
+
+    page = await server.fetch_tiered_page(QUERY, 10, None, True)
+
+    assert len(page["items"]) == 10
+    assert page["next_cursor"] is None
+
+
+async def test_export_merge_skips_the_copy_in_both_tiers(server):
+    expected = await seed_tiers(server)
+
+    notes = [note async for note in server._iter_tiers(QUERY, True)]
+
+    assert [note["id"] for note in notes] == expected
+
+
+async def test_archiving_moves_old_notes_and_bumps_their_version(server):
+    await server.db.companies.insert_one({"id": COMPANY_ID, "name": "Firma"})
+    old = make_note(1)
+    recent = make_note(2, timestamp=datetime.now(timezone.utc))
+    await server.db.notes.insert_many([old, recent])
+
+    assert await server.archive_old_notes(months=12) == 1
+
+    assert [note["id"] async for note in server.db.notes.find()] == [recent["id"]]
+    assert [note["id"] async for note in server.db.notes_archive.find()] == [old["id"]]
+    version = await server.db.counters.find_one({"_id": server.notes_version_key(COMPANY_ID, "employee-0")})
+    assert version["version"] == 1
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from .conftest import COMPANY_ID, make_note
+
+pytestmark = pytest.mark.anyio
+
+
+async def seed_changes(server, seqs, changed_at):
+    await server.db.notes.insert_many([
+        make_note(seq, change_seq=seq, changed_at=changed_at) for seq in seqs
+    ])
+
+
+async def fetch(server, since, limit=10):
+    page = await server.fetch_changes("notes", "notes", COMPANY_ID, since, limit, server.NOTE_PROJECTION)
+    return [note["id"] for note in page["items"]], page["next_token"]
+
+
+async def test_changes_stop_in_front_of_a_recent_gap(server):
+    await seed_changes(server, [1, 2, 4], datetime.now(timezone.utc))
+
+    # Number 3 may belong to a write that has not landed yet
+    assert await fetch(server, "0") == (["note-001", "note-002"], "2")
+    assert await fetch(server, "2") == ([], "2")
+
+
+async def test_settled_gaps_are_skipped(server):
+    await seed_changes(server, [1, 2, 4], datetime.now(timezone.utc) - timedelta(seconds=60))
+
+    assert await fetch(server, "0") == (["note-001", "note-002", "note-004"], "4")
+
+
+async def test_changes_without_watermark_return_the_current_one(server):
+    await server.stamp_changes("notes", COMPANY_ID, [{}, {}])
+
+    assert await fetch(server, None) == ([], "2")
+
+
+def test_batch_replays_take_no_change_numbers(api, server):
+    batch = {"notes": [{"employee_id": "employee-0", "note_text": "Eins", "idempotency_key": "k1"}]}
+    first = api.post("/api/notes/batch", json=batch).json()
+
+    replay = api.post("/api/notes/batch", json=batch).json()
+
+    assert replay["results"][0] == {"index": 0, "status": "duplicate", "id": first["results"][0]["id"], "detail": None}
+    changes = api.get("/api/notes/changes", params={"since": "0"}).json()
+    assert changes["next_token"] == "1"
+    assert [note["id"] for note in changes["items"]] == [first["results"][0]["id"]]
@@ -0,0 +1,44 @@
+from .conftest import COMPANY_ID, run
+
+
+def test_unknown_resources_are_never_not_modified(api, server):
+    run(server.db.employees.insert_one({
+        "id": "foreign", "employee_number": "1", "name": "X", "company_id": "company-2",
+    }))
+    run(server.bump_versions([server.notes_version_key("company-2", "foreign")]))
+
+    assert api.get("/api/companies/unknown", headers={"If-None-Match": "*"}).status_code == 404
+    assert api.get("/api/notes/employee/foreign", headers={"If-None-Match": "*"}).status_code == 404
+    forged = 'W/"version:unknown:0"'
+    assert api.get("/api/companies/unknown", headers={"If-None-Match": forged}).status_code == 404
+
+
+def test_employee_list_is_revalidated_against_the_company_version(api):
+    first = api.get("/api/employees")
+    assert "etag" not in first.headers  # No write yet, nothing to validate against
+
+    api.post("/api/employees", json={"employee_number": "9000", "name": "Neu"})
+    second = api.get("/api/employees")
+    etag = second.headers["etag"]
+    assert second.headers["cache-control"] == "private, no-cache"
+    assert api.get("/api/employees", headers={"If-None-Match": etag}).status_code == 304
+    assert api.get("/api/employees", headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+    assert api.get("/api/companies/" + COMPANY_ID, headers={"If-None-Match": etag}).status_code == 304
+
+    api.post("/api/employees", json={"employee_number": "9001", "name": "Neuer"})
+    third = api.get("/api/employees", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert len(third.json()["items"]) == 4
+
+
+def test_employee_notes_change_with_their_own_version_only(api):
+    api.post("/api/notes", json={"employee_id": "employee-0", "note_text": "Eins"})
+    etag = api.get("/api/notes/employee/employee-0").headers["etag"]
+
+    api.post("/api/notes", json={"employee_id": "employee-1", "note_text": "Andere"})
+    assert api.get("/api/notes/employee/employee-0", headers={"If-None-Match": etag}).status_code == 304
+
+    api.post("/api/notes/batch", json={"notes": [{"employee_id": "employee-0", "note_text": "Zwei"}]})
+    response = api.get("/api/notes/employee/employee-0", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
@@ -0,0 +1,79 @@
+import pytest
+
+
+def employee(server, number, company_id="company-1", employee_id=None):
+    return server.Employee(
+        id=employee_id or f"{company_id}-{number}", employee_number=number, name=f"Name {number}", company_id=company_id
+    )
+
+
+@pytest.fixture
+def directory(server):
+    return server.EmployeeDirectory(max_size=4, ttl=60)
+
+
+def test_least_recently_used_company_is_evicted_whole(server, directory):
+    for number in ("1", "2"):
+        directory.put(employee(server, number, "a"))
+        directory.put(employee(server, number, "b"))
+    assert directory.get_by_number("a", "1")  # a is now the most recently used
+
+    directory.put(employee(server, "1", "c"))
+
+    assert list(directory._companies) == ["a", "c"]
+    assert directory.size == 3
+    assert directory.get_by_number("b", "1") is None
+
+
+def test_single_company_drops_its_oldest_entries(server, directory):
+    for number in ("1", "2", "3", "4", "5"):
+        directory.put(employee(server, number))
+
+    assert directory.size == 4
+    assert directory.get_by_number("company-1", "1") is None
+    assert directory.get_by_id("company-1", "company-1-1") is None
+    assert directory.get_by_number("company-1", "5").id == "company-1-5"
+
+
+def test_invalidating_a_company_keeps_the_others(server, directory):
+    directory.put(employee(server, "1", "a"))
+    directory.put(employee(server, "2", "a"))
+    directory.put(employee(server, "1", "b"))
+
+    directory.invalidate_company("a")
+    directory.invalidate_company("unknown")
+
+    assert directory.size == 1
+    assert directory.get_by_id("a", "a-1") is None
+    assert directory.get_by_id("b", "b-1").employee_number == "1"
+
+
+def test_expired_entries_are_removed(server, directory, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    directory.put(employee(server, "1"))
+
+    now[0] += 61
+
+    assert directory.get_by_number("company-1", "1") is None
+    assert (directory.size, directory._companies) == (0, {})
+
+
+def test_number_moved_to_another_employee(server, directory):
+    directory.put(employee(server, "1", employee_id="old"))
+
+    directory.put(employee(server, "1", employee_id="new"))
+
+    assert directory.size == 1
+    assert directory.get_by_number("company-1", "1").id == "new"
+    assert directory.get_by_id("company-1", "old") is None
+
+
+def test_employee_moved_to_another_number(server, directory):
+    directory.put(employee(server, "1", employee_id="e"))
+
+    directory.put(employee(server, "2", employee_id="e"))
+
+    assert directory.size == 1
+    assert directory.get_by_number("company-1", "1") is None
+    assert directory.get_by_id("company-1", "e").employee_number == "2"
@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+from .conftest import run
+
+
+def upload(api, content: str):
+    files = {"file": ("mitarbeiter.csv", io.BytesIO(content.encode()), "text/csv")}
+    return api.post("/api/employees/import", files=files)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_every_data_row_lands_in_one_bucket(api, server, monkeypatch, chunk_size):
+    monkeypatch.setattr(server, "IMPORT_CHUNK_SIZE", chunk_size)
+    rows = [
+        "employee_number;name",
+        "0000;Mitarbeiter 0",  # unchanged
+        "0001;Umbenannt",      # updated
+        "5000;Neu",
+        "5000;Neu korrigiert",  # supersedes the row above within a chunk
+        "5001;",               # rejected
+        "5002;Noch neu",
+    ]
+
+    summary = upload(api, "\n".join(rows) + "\n").json()
+
+    counted = summary["inserted"] + summary["updated"] + summary["unchanged"] + summary["superseded"] + summary["rejected"]
+    assert counted == len(rows) - 1
+    assert summary["rejected"] == 1
+    assert summary["errors"][0]["row"] == 6
+    names = {employee["employee_number"]: employee["name"] for employee in run(server.db.employees.find().to_list(None))}
+    assert names["5000"] == "Neu korrigiert"
+    assert names["0001"] == "Umbenannt"
+
+
+def test_superseded_rows_within_a_chunk(api, server):
+    summary = upload(api, "employee_number,name\n7,A\n7,B\n7,C\n").json()
+
+    assert (summary["inserted"], summary["superseded"]) == (1, 2)
+
+
+def test_missing_columns_are_a_bad_request(api):
+    response = upload(api, "nummer,name\n1,A\n")
+
+    assert response.status_code == 400
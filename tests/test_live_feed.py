@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from .conftest import COMPANY_ID, USER_ID, make_note
+
+pytestmark = pytest.mark.anyio
+
+
+def stream_user(server):
+    return server.User(id=USER_ID, email="user@firma.de", company_id=COMPANY_ID, role="user")
+
+
+async def test_subscription_is_released_when_client_leaves_before_the_stream(server, monkeypatch):
+    broker = server.NoteBroker(10)
+    monkeypatch.setattr(server, "note_broker", broker)
+    response = await server.stream_notes(stream_user(server))
+    assert broker.size == 1
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("connection closed")
+
+    # The start message already fails, so the body generator never runs
+    with pytest.raises(Exception):
+        await response({"type": "http", "method": "GET", "path": "/api/notes/stream"}, receive, send)
+    assert broker.size == 0
+
+
+async def test_stream_delivers_published_notes(server, monkeypatch):
+    broker = server.NoteBroker(10)
+    monkeypatch.setattr(server, "note_broker", broker)
+    response = await server.stream_notes(stream_user(server))
+    chunks = response.body_iterator
+
+    assert await anext(chunks) == b"retry: 3000\n\n"
+    broker.publish(COMPANY_ID, [make_note(1)])
+    event = await asyncio.wait_for(anext(chunks), 1)
+    assert event.startswith(b"event: note\ndata: ") and b"note-001" in event
+
+
+async def test_slow_subscriber_is_dropped(server):
+    broker = server.NoteBroker(2)
+    subscription = broker.subscribe(COMPANY_ID)
+
+    broker.publish(COMPANY_ID, [make_note(index) for index in range(3)])
+
+    assert subscription.dropped
+    assert (broker.size, broker.dropped) == (0, 1)
+
+
+async def test_stream_ticket_only_opens_the_stream(server):
+    await server.db.users.insert_one({"id": USER_ID, "email": "user@firma.de", "company_id": COMPANY_ID, "role": "user"})
+    ticket = (await server.create_stream_ticket(stream_user(server))).ticket
+
+    assert (await server.get_stream_user(ticket=ticket, credentials=None)).id == USER_ID
+    # A ticket is no login token, and the login token is no ticket
+    with pytest.raises(server.HTTPException):
+        await server.authenticate_token(ticket)
+    with pytest.raises(server.HTTPException):
+        await server.get_stream_user(ticket=server.create_access_token({"sub": USER_ID}), credentials=None)
+
+
+async def test_stream_ends_when_the_worker_shuts_down(server, monkeypatch):
+    monkeypatch.setattr(server, "note_broker", server.NoteBroker(10))
+    monkeypatch.setattr(server, "live_feed_closing", server.asyncio.Event())
+    response = await server.stream_notes(stream_user(server))
+    chunks = response.body_iterator
+    assert await anext(chunks) == b"retry: 3000\n\n"
+
+    pending = asyncio.ensure_future(anext(chunks))
+    await asyncio.sleep(0)
+    server.live_feed_closing.set()
+
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(pending, 1)
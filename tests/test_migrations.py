@@ -0,0 +1,44 @@
+import pytest
+
+from .conftest import COMPANY_ID, make_note
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_new_database_is_marked_converted(server):
+    await server.require_converted_timestamps()
+
+    assert await server.db.migrations.find_one({"_id": "convert_timestamps"})
+
+
+async def test_string_timestamps_block_startup_until_converted(server):
+    legacy = make_note(1)
+    legacy["timestamp"] = legacy["timestamp"].isoformat()
+    await server.db.notes.insert_many([make_note(0), legacy])
+
+    with pytest.raises(RuntimeError, match="convert-timestamps"):
+        await server.require_converted_timestamps()
+
+    assert await server.convert_string_timestamps() == 1
+    assert await server.db.migrations.find_one({"_id": "convert_timestamps"})
+    await server.require_converted_timestamps()
+    note = await server.db.notes.find_one({"id": legacy["id"]})
+    assert note["timestamp"] == make_note(1)["timestamp"]
+
+
+async def test_notes_without_company_block_startup_until_backfilled(server):
+    await server.db.employees.insert_one({"id": "employee-0", "employee_number": "0", "name": "X", "company_id": COMPANY_ID})
+    legacy = make_note(1)
+    del legacy["company_id"]
+    orphan = make_note(2, employee_id="deleted")
+    del orphan["company_id"]
+    await server.db.notes.insert_many([make_note(0), legacy, orphan])
+
+    with pytest.raises(RuntimeError, match="backfill-note-company-ids"):
+        await server.require_note_company_ids()
+
+    assert await server.backfill_note_company_ids() == 1
+    # The note of the deleted employee cannot be backfilled and does not block
+    assert await server.db.migrations.find_one({"_id": "backfill_note_company_ids"})
+    await server.require_note_company_ids()
+    assert (await server.db.notes.find_one({"id": legacy["id"]}))["company_id"] == COMPANY_ID
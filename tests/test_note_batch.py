@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from .conftest import make_note, run
+
+
+@pytest.fixture
+def indexed_api(api, server):
+    # mongomock ignores partialFilterExpression, so every note here carries an idempotency key
+    run(server.ensure_indexes())
+    return api
+
+
+def upload(api, *notes):
+    response = api.post("/api/notes/batch", json={"notes": list(notes)})
+    assert response.status_code == 200
+    return response.json()
+
+
+def item(key, employee_id="employee-0", **fields):
+    return {"employee_id": employee_id, "note_text": f"Notiz {key}", "idempotency_key": key, **fields}
+
+
+def test_results_follow_the_order_of_the_batch(indexed_api, server):
+    body = upload(indexed_api, item("k1"), item("k2", employee_id="unknown"), item("k1"), item("k3", employee_id="employee-1"))
+
+    statuses = [(result["index"], result["status"]) for result in body["results"]]
+    assert statuses == [(0, "created"), (1, "rejected"), (2, "duplicate"), (3, "created")]
+    assert (body["created"], body["duplicates"], body["rejected"]) == (2, 1, 1)
+    assert body["results"][1]["detail"] == "Employee not found"
+    assert body["results"][2]["id"] == body["results"][0]["id"]
+    assert run(server.db.notes.count_documents({})) == 2
+
+
+def test_replayed_batch_reports_the_stored_notes(indexed_api, server):
+    first = upload(indexed_api, item("k1"), item("k2"))
+
+    replay = upload(indexed_api, item("k1"), item("k2"), item("k3"))
+
+    assert [result["status"] for result in replay["results"]] == ["duplicate", "duplicate", "created"]
+    assert [result["id"] for result in replay["results"][:2]] == [result["id"] for result in first["results"]]
+    assert run(server.db.notes.count_documents({})) == 3
+
+
+def test_concurrent_writes_fail_single_items_only(indexed_api, server, monkeypatch):
+    stamp_changes = server.stamp_changes
+
+    async def concurrent_upload(kind, company_id, docs):
+        # Lands after the replay check: one note with the same key, one colliding on the note id
+        await server.db.notes.insert_many([
+            make_note(1, idempotency_key="k1"),
+            make_note(2, id=docs[1]["id"], idempotency_key="other"),
+        ])
+        await stamp_changes(kind, company_id, docs)
+
+    monkeypatch.setattr(server, "stamp_changes", concurrent_upload)
+
+    body = upload(indexed_api, item("k1"), item("k2"), item("k3"))
+
+    assert [result["status"] for result in body["results"]] == ["duplicate", "rejected", "created"]
+    assert body["results"][0]["id"] == "note-001"
+    assert body["results"][1]["id"] is None
+    assert run(server.db.notes.find_one({"idempotency_key": "k3"}))
+
+
+def test_future_timestamps_are_replaced_by_the_upload_time(indexed_api, server):
+    now = datetime.now(timezone.utc)
+    past = now - timedelta(days=1)
+
+    body = upload(
+        indexed_api,
+        item("k1", timestamp=past.isoformat()),
+        item("k2", timestamp=(now + timedelta(days=30)).isoformat()),
+        item("k3", timestamp=(now + timedelta(seconds=60)).isoformat()),
+    )
+
+    notes = {note["idempotency_key"]: note for note in run(server.db.notes.find().to_list(None))}
+    assert notes["k1"]["timestamp"] == past.replace(microsecond=past.microsecond // 1000 * 1000)
+    assert notes["k2"]["timestamp"] < now + timedelta(seconds=10)
+    assert body["results"][1]["detail"] == "Timestamp in the future, stored with the upload time"
+    # Small skew is tolerated
+    assert notes["k3"]["timestamp"] > now + timedelta(seconds=30)
+    assert body["results"][2]["detail"] is None
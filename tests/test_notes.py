@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from .conftest import COMPANY_ID, make_note, run
+
+
+def test_created_note_is_counted_and_versioned(api, server):
+    response = api.post("/api/notes", json={"employee_id": "employee-0", "note_text": "Hallo"})
+
+    assert response.status_code == 200
+    rollups = run(server.db.note_rollups.find().to_list(None))
+    assert [rollup["count"] for rollup in rollups] == [1]
+    version = run(server.db.counters.find_one({"_id": server.notes_version_key(COMPANY_ID, "employee-0")}))
+    assert version["version"] == 1
+
+
+def test_failed_follow_up_does_not_fail_a_stored_note(api, server, monkeypatch, caplog):
+    async def broken_rollups(company_id, docs):
+        raise PyMongoError("rollups unavailable")
+
+    monkeypatch.setattr(server, "record_note_rollups", broken_rollups)
+
+    response = api.post("/api/notes", json={"employee_id": "employee-0", "note_text": "Hallo"})
+
+    assert response.status_code == 200
+    assert run(server.db.notes.count_documents({"id": response.json()["id"]})) == 1
+    # The version is bumped independently of the rollups
+    assert run(server.db.counters.find_one({"_id": server.notes_version_key(COMPANY_ID, "employee-0")}))
+    assert "rebuild the note rollups" in caplog.text
+
+
+@pytest.mark.anyio
+async def test_group_commit_bumps_versions_before_callers_return(server, monkeypatch):
+    bump = server.bump_note_versions
+
+    async def slow_bump(company_id, docs):
+        await asyncio.sleep(0.01)
+        await bump(company_id, docs)
+
+    monkeypatch.setattr(server, "bump_note_versions", slow_bump)
+    group_commit = server.NoteGroupCommit(window=0.001, max_docs=10)
+
+    await asyncio.gather(*(group_commit.insert(make_note(index)) for index in range(3)))
+
+    version = await server.db.counters.find_one({"_id": server.notes_version_key(COMPANY_ID, "employee-0")})
+    assert version["version"] == 1
+    assert await server.db.notes.count_documents({}) == 3
+    await group_commit.close()
+
+
+def test_trusted_and_validated_responses_format_datetimes_alike(api):
+    created = api.post("/api/notes", json={"employee_id": "employee-0", "note_text": "Hallo"}).json()
+
+    listed = api.get("/api/notes").json()["items"][0]
+
+    assert created["timestamp"].endswith("Z")
+    assert listed["timestamp"].endswith("Z")
+    assert listed["timestamp"][:23] == created["timestamp"][:23]
@@ -0,0 +1,69 @@
+import pytest
+from fastapi import HTTPException
+
+from .conftest import make_note, run
+
+
+def test_employee_pages_follow_employee_numbers(api, server):
+    run(server.db.employees.insert_many([
+        {"id": f"extra-{index}", "employee_number": f"1{index:03}", "name": "X", "company_id": "company-1"}
+        for index in range(5)
+    ]))
+
+    numbers, cursor = [], None
+    while True:
+        page = api.get("/api/employees", params={"limit": 3, "cursor": cursor}).json()
+        numbers += [employee["employee_number"] for employee in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert numbers == sorted(numbers)
+    assert len(numbers) == 7
+
+
+def test_note_pages_break_timestamp_ties_by_id(api, server):
+    notes = [make_note(index) for index in range(6)]
+    for note in notes[3:]:
+        note["timestamp"] = notes[2]["timestamp"]
+    run(server.db.notes.insert_many(notes))
+
+    ids, cursor = [], None
+    while True:
+        page = api.get("/api/notes", params={"limit": 2, "cursor": cursor}).json()
+        ids += [note["id"] for note in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert ids == ["note-005", "note-004", "note-003", "note-002", "note-001", "note-000"]
+
+
+@pytest.mark.parametrize("values", [
+    [{"$ne": None}, "x"],
+    [{"$foo": 1}, "x"],
+    ["2025-01-01", "x"],
+    [1.5, {"$regex": "."}],
+    ["x"],
+    "not a list",
+])
+def test_cursor_values_must_have_the_sort_field_types(server, values):
+    cursor = server.encode_cursor(values)
+
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor, ["timestamp", "id"])
+    assert error.value.status_code == 400
+
+
+def test_search_cursor_holds_score_and_id(server):
+    cursor = server.encode_cursor([1.25, "note-1"])
+
+    assert server.decode_cursor(cursor, ["score", "id"]) == [1.25, "note-1"]
+    with pytest.raises(HTTPException):
+        server.decode_cursor(cursor, ["timestamp", "id"])
+
+
+def test_malformed_cursor_is_a_bad_request(api):
+    assert api.get("/api/notes", params={"cursor": "%%%"}).status_code == 400
+    bad = api.get("/api/employees", params={"cursor": "W3siJG5lIjogbnVsbH1d"})
+    assert bad.status_code == 400
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def command_event(request_id: int, command: dict, duration_micros: int = 0):
+    name = next(iter(command))
+    return SimpleNamespace(
+        connection_id=("localhost", 27017), request_id=request_id, command_name=name,
+        command=command, database_name="staff_scanner_test", duration_micros=duration_micros,
+    )
+
+
+@pytest.fixture
+def slow_requests(server, monkeypatch):
+    recorded = []
+
+    async def record(record, trace):
+        recorded.append(record["route"])
+
+    monkeypatch.setattr(server, "SLOW_REQUEST_MS", 0.001)
+    monkeypatch.setattr(server, "record_slow_request", record)
+    return recorded
+
+
+def test_command_shape_cuts_value_lists_but_keeps_pipelines(server):
+    command = {
+        "aggregate": "notes",
+        "pipeline": [{"$match": {"id": {"$in": ["a", "b", "c"]}}}, {"$sort": {"timestamp": -1}}],
+        "updates": [{"q": {"id": "a"}}, {"q": {"id": "b"}}],
+    }
+
+    assert server.command_shape(command) == {
+        "aggregate": "notes",
+        "pipeline": [{"$match": {"id": {"$in": ["a"]}}}, {"$sort": {"timestamp": -1}}],
+        "updates": [{"q": {"id": "a"}}],
+    }
+
+
+def test_trace_keeps_totals_and_only_the_slowest_commands(server, monkeypatch):
+    trace = server.RequestTrace(max_commands=2)
+    monkeypatch.setattr(server, "request_trace", server.ContextVar("request_trace", default=trace))
+    listener = server.MongoCommandMetrics()
+
+    for request_id, duration in enumerate([5, 1, 9, 3]):
+        event = command_event(request_id, {"find": "employees", "filter": {"id": {"$in": ["a", "b"]}}}, duration * 1000)
+        listener.started(event)
+        listener.succeeded(event)
+
+    assert trace.commands == 4
+    assert trace.totals == {("employees", "find"): (4, 18.0)}
+    slowest = sorted(trace.slowest, reverse=True)
+    assert [entry[0] for entry in slowest] == [9.0, 5.0]
+    assert slowest[0][4] == ("staff_scanner_test", {"find": "employees", "filter": {"id": {"$in": ["a"]}}})
+
+    trace.stop()
+    listener.started(event)
+    listener.succeeded(event)
+    assert (trace.commands, trace.slowest) == (4, [])
+
+
+def test_slow_requests_are_recorded(api, slow_requests):
+    assert api.get("/api/employees").status_code == 200
+
+    assert slow_requests == ["/api/employees"]
+
+
+def test_streamed_exports_are_not_traced(api, slow_requests):
+    response = api.get("/api/notes/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert slow_requests == []